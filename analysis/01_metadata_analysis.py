@@ -21,6 +21,8 @@ try:
     application_domain_plot_filename    = configuration["statistics_out_basedir"] + "/" + configuration["metadata_analisys"]["outputs"]["application_domain_plot_filename"]
     cs_topics_over_time_plot_filename   = configuration["statistics_out_basedir"] + "/" + configuration["metadata_analisys"]["outputs"]["cs_topics_over_time_plot_filename"]
     ccdf_graph_output_filename          = configuration["statistics_out_basedir"] + "/" + configuration["metadata_analisys"]["outputs"]["ccdf_graph_output_filename"]
+    topic_counts_matrix                 = configuration["statistics_out_basedir"] + "/" + configuration["metadata_analisys"]["outputs"]["topic_counts_matrix"]
+    authors_per_work_dataset            = configuration["statistics_out_basedir"] + "/" + configuration["metadata_analisys"]["outputs"]["authors_per_work_dataset"]
     
     analized_country                    = configuration["analized_country_full"]
     start_year                          = configuration["metadata_analisys"]["config"]["start_year"]
@@ -32,6 +34,9 @@ except KeyError as e:
     print("Error: key {} not present in configuration file".format(e))
     exit(-1)
 
+import run_ledger
+run_ledger.configure(configuration, "01_metadata_analysis")
+
 intervals_years = []
 try:
     for interval in configuration["time_intervals"]:
@@ -59,6 +64,8 @@ print(f"  App Domain Plot:      {application_domain_plot_filename}")
 print(f"  CS Topics Plot:       {cs_topics_over_time_plot_filename}")
 print(f"  CCDF Path:            {ccdf_path}")
 print(f"  CCDF Graph Filename:  {ccdf_graph_output_filename}")
+print(f"  Topic Counts Matrix:  {topic_counts_matrix}")
+print(f"  Authors/Work Dataset: {authors_per_work_dataset}")
 
 print(f"{'=' * 60}\n")
 
@@ -71,36 +78,42 @@ print(f"{'=' * 60}\n")
 # application_domains_mapping: Mapping to unify and filter application-domain labels.
 # application_domains_to_delete: list of application domainst that should be removed from the analisys
 from mappings import topics_mapping, application_domains_mapping, application_domains_to_delete, colors
-from topic_to_category import topic_to_category
-
-def normalize_ascii(text):
-    if isinstance(text, bytes):
-        text = text.decode("utf-8", "ignore")
-    return text.encode("ascii", "ignore").decode("ascii")
-
-data = {}
-with open(metadata_path, 'r') as f:
-    next(f)  # skip header
-
-    for line in f:
-        parts = line.strip().split(',')
-        work_id = parts[0]
-        year = parts[1]
-        number_of_authors = parts[2]
-
-        if year not in data:
-            data[year] = []
-
-        data[year].append({"id": parts[0], "author_count": parts[2], "topics": parts[3].split(';')})
-
-data_sorted = dict(sorted(data.items()))
-
-x = [
-    int(year)
-    for year in data_sorted.keys()
-    if year.isdigit() and start_year <= int(year) < end_year
-]
-y = [len(data_sorted[str(year)]) for year in x]
+# topic_to_category: fine-grained topic -> category lookup, read lazily from topic_to_category.tsv
+from topic_categories import topic_to_category
+
+from metadata_aggregation import aggregate_metadata
+from compute_structural_statistics import eval_ccdf
+from topic_matrix import (build_year_topic_matrix, select_years, aggregation_matrix, top_group_shares,
+                          save_year_topic_matrix, load_year_topic_matrix)
+
+authors_per_work = None
+if os.path.exists(topic_counts_matrix) and os.path.getmtime(topic_counts_matrix) >= os.path.getmtime(metadata_path):
+    print(f"Loading year x topic counts from {topic_counts_matrix}")
+    years_present, works_per_year, vocabulary, topic_counts, authors_per_work = load_year_topic_matrix(topic_counts_matrix)
+
+# caches written before the authors per work histogram was stored are rebuilt
+if authors_per_work is None:
+    # parallel pass over newline-aligned byte ranges of the metadata, only per-year aggregates are kept
+    print(f"Aggregating metadata from {metadata_path}")
+    with run_ledger.measure("metadata_aggregation", metadata_path):
+        works_counter, authors_histogram, pair_counts, raw_vocabulary = aggregate_metadata(metadata_path)
+
+    years_present, vocabulary, topic_counts = build_year_topic_matrix(pair_counts, raw_vocabulary)
+    works_per_year = np.array([works_counter[year] for year in years_present])
+    authors_per_work = np.array([(year, authors, works) for (year, authors), works in sorted(authors_histogram.items())],
+                                dtype=np.int64).reshape(-1, 3)
+    save_year_topic_matrix(topic_counts_matrix, years_present, works_per_year, vocabulary, topic_counts, authors_per_work)
+    print(f"Stored year x topic counts to {topic_counts_matrix}")
+
+# written even when the counts come from the cache, so that a newly configured path is produced
+authors_df = pd.DataFrame(authors_per_work, columns=["Year", "Authors", "Works"])
+authors_df.to_csv(authors_per_work_dataset, index=False)
+print(f"Stored authors per work histogram to {authors_per_work_dataset}")
+
+works_by_year = dict(zip(years_present.tolist(), works_per_year.tolist()))
+
+x = [year for year in works_by_year.keys() if start_year <= year < end_year]
+y = [works_by_year[year] for year in x]
 
 if intervals_years:
 
@@ -165,9 +178,9 @@ if intervals_years:
         total_works_per_interval_x.append(midpoint)
 
         year_works = [
-            len(data_sorted[str(year)])
+            works_by_year[year]
             for year in range(start, end + 1)
-            if str(year) in data_sorted
+            if year in works_by_year
         ]
 
         total_works_per_interval_y.append(sum(year_works))
@@ -256,107 +269,21 @@ df.to_csv(new_name, index=False)
 print("saved plots works per year")
 
 
-def get_topics_by_year(data, year):
-    if not year in data:
-        return None
-    
-    topics = [
-        normalize_ascii(
-            t[t.find("(") + 1 : t.find(")")].capitalize()
-            if "(" in t and ")" in t
-            else t
-        )
-        for work in data[year]
-        for t in work["topics"]
-    ]   
-
-    topic_counts = Counter(topics)
-
-    # remove 'Computer science'
-    for domain in application_domains_to_delete:
-        if domain in topic_counts:
-            del topic_counts[domain]
-
-    return topic_counts
-
-
-def normalize_topic_counts(topic_counts):
-    total = sum(topic_counts.values())
-    normalized_counts = {topic: round((count / total) * 100, 2) for topic, count in topic_counts.items()}
-    return normalized_counts
-
-
-def get_application_domains(topics_by_year):
-    # sort topics by frequency
-    sorted_topics = sorted(topics_by_year.items(), key=lambda item: item[1], reverse=True)
-
-    return (sorted_topics[:20])
-
-
-def filter(topics, criteria):
-    to_return = topics.copy()
-    for topic in criteria.keys():
-        if topic in to_return:
-            del to_return[topic]
-    return to_return
-
-
-def marco_filter(topics, criteria):
-    to_return = {}
-
-    for topic in topics.keys():
-        if topic not in criteria:
-            # print(f"Topic '{topic}' not found in criteria mapping. Skipping.")
-            continue
-
-        if criteria[topic] == "Others":
-            continue
-        to_return[topic] = topics[topic]
-
-    return to_return
-
-
-def uniform_application_domain(topics, application_domains):
-    to_return = {}
-
-    for topic, freq in topics.items():
-        topic = normalize_ascii(topic)
-        new_key = application_domains[topic] if topic in application_domains else topic
-        to_return[new_key] = to_return.get(new_key, 0) + freq
-
-    return to_return
-
-
-categories_over_time = {}
-
 years = list(range(start_year, end_year))
 
-for idx, year in enumerate(years):
-
-    # here we get all topics by year
-    topics = get_topics_by_year(data_sorted, str(year))
-    if topics is None:
-        continue
-
-    # then we filter out CS topics 
-    # to focus on the application domains
-    filtered_topics = filter(topics, topics_mapping)
-    # we need to uniform the application domains
-    # otherwise we will have specific subtopics (e.g., Medicine, Internal medicine, etc.)
-    uniformed_topics = uniform_application_domain(filtered_topics, application_domains_mapping)
-    # then we normalize the counts to get percentages
-    normalized_topics = normalize_topic_counts(uniformed_topics)
-    # we sort the topics by percentage
-    # and we get only the most frequent ones
-    sorted_topics = dict(sorted(normalized_topics.items(), key=lambda item: item[1], reverse=True))
-
-    for topic, percentage in list(sorted_topics.items())[:max_topics]:
-        if topic not in categories_over_time:
-            categories_over_time[topic] = np.zeros(len(years), dtype=float)
-
-        categories_over_time[topic][idx] = percentage
+# every chart below is a product of the years x topics counts with a topics x groups aggregation matrix
+window_counts = select_years(years_present, topic_counts, years)
 
-years = list(range(start_year, end_year))
+# application domains: drop the deleted topics and the CS topics,
+# then uniform specific subtopics (e.g., Medicine, Internal medicine, etc.)
+deleted_topics = set(application_domains_to_delete)
+application_domains = [
+    None if topic in deleted_topics or topic in topics_mapping
+    else application_domains_mapping.get(topic, topic)
+    for topic in vocabulary
+]
+application_aggregation, application_groups = aggregation_matrix(application_domains)
+categories_over_time = top_group_shares(window_counts @ application_aggregation, application_groups, max_topics)
 
 fig = plt.figure(figsize=(11, 6))
 bottom = np.zeros(len(years))
@@ -380,38 +307,17 @@ plt.savefig(application_domain_plot_filename, bbox_inches='tight')
 
 print("Saved plot for application domains over time")
 
-cs_topics_over_time = {}
-
-topics = get_topics_by_year(data_sorted, str(1990))
-filtered_topics = filter(topics, application_domains_mapping)
-marco_filtered_topics = marco_filter(filtered_topics, topic_to_category)
-
-years = list(range(start_year, end_year))
-
-for idx, year in enumerate(years):
-    # here we get all topics by year
-    topics = get_topics_by_year(data_sorted, str(year))
-
-    if topics is None:
-        continue
-
-    # then we filter out app domains topics 
-    # to focus on CS-related subfields
-    filtered_topics = filter(topics, application_domains_mapping)
-    marco_filtered_topics = marco_filter(filtered_topics, topic_to_category)
-    # we need to uniform the subtopics
-    uniformed_topics = uniform_application_domain(marco_filtered_topics, topic_to_category)  # cs_topics
-    # then we normalize the counts to get percentages
-    normalized_topics = normalize_topic_counts(uniformed_topics)
-    # we sort the topics by percentage
-    # and we get only the most frequent ones
-    sorted_topics = dict(sorted(normalized_topics.items(), key=lambda item: item[1], reverse=True))
-
-    for topic, percentage in list(sorted_topics.items())[:max_topics]:
-        if topic not in cs_topics_over_time:
-            cs_topics_over_time[topic] = np.zeros(len(years), dtype=float)
-
-        cs_topics_over_time[topic][idx] = percentage
+# CS disciplines: drop the deleted topics and the application domains,
+# then map every topic to its category, ignoring "Others"
+category_ids = topic_to_category.map_category_ids(vocabulary)
+cs_categories = [
+    None if topic in deleted_topics or topic in application_domains_mapping
+    or category_id < 0 or topic_to_category.categories[category_id] == "Others"
+    else topic_to_category.categories[category_id]
+    for topic, category_id in zip(vocabulary, category_ids)
+]
+cs_aggregation, cs_groups = aggregation_matrix(cs_categories)
+cs_topics_over_time = top_group_shares(window_counts @ cs_aggregation, cs_groups, max_topics)
 
 # transform cs_topic_over_time to df
 cs_df = pd.DataFrame(cs_topics_over_time, index=years)
@@ -452,17 +358,6 @@ plt.savefig(cs_topics_over_time_plot_filename, bbox_inches='tight')
 
 print("Saved plot for computer science topics over time")
 
-def eval_ccdf(graph):
-    degree_sequence = sorted(
-        (d for _, d in graph.degree()),
-        reverse=True
-    )
-    degreeCount = Counter(degree_sequence)
-    deg, cnt = zip(*degreeCount.items())
-    cs = np.cumsum(cnt)
-    return np.array(deg), np.array(cs)
-
-
 def load_interval_network(input_path, start, end):
     dfs = []
     if input_path.endswith(".csv"):
@@ -497,13 +392,15 @@ for start, end in units:
         continue
     input_file_name = f"{ccdf_input_path}/{label}_dataset.csv"
     print(f"Loading network from {input_file_name}...")
-    net_df = load_interval_network(input_file_name, start, end)
-    if net_df is None:
-        print(f"  No data found — skipping")
-        continue
+    with run_ledger.measure(f"ccdf_{label}", input_file_name) as record:
+        net_df = load_interval_network(input_file_name, start, end)
+        if net_df is None:
+            print(f"  No data found — skipping")
+            continue
 
-    G = nx.from_pandas_edgelist(net_df, source='author_id1', target='author_id2')
-    deg, cs = eval_ccdf(G)
+        G = nx.from_pandas_edgelist(net_df, source='author_id1', target='author_id2')
+        deg, cs = eval_ccdf(G)
+        record["edges"] = len(net_df)
 
     np.savetxt(output_path, np.column_stack((deg, cs)), delimiter=",", header="deg,cs", comments="", fmt="%d")
 
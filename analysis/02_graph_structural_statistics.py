@@ -10,6 +10,22 @@ try:
     graph_directory                 = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["backbones"]["inputs"]["graph_directory"]
     output_stats_file               = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["output_stats_file"]
     output_stats_file_largest_cc    = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["output_stats_file_largest_cc"]
+    streaming                       = configuration["structural_statistics"]["config"]["streaming"]
+    chunk_size                      = configuration["structural_statistics"]["config"]["chunk_size"]
+    work_directory                  = configuration["structural_statistics"]["config"]["work_directory"]
+    rolling                         = configuration["structural_statistics"]["config"]["rolling"]
+    rolling_window                  = configuration["structural_statistics"]["config"]["rolling_window"]
+    rolling_step                    = configuration["structural_statistics"]["config"]["rolling_step"]
+    rolling_stats_file              = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["rolling_stats_file"]
+    rolling_stats_file_largest_cc   = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["rolling_stats_file_largest_cc"]
+    cumulative                      = configuration["structural_statistics"]["config"]["cumulative"]
+    cumulative_snapshot_directory   = configuration["structural_statistics"]["config"]["cumulative_snapshot_directory"]
+    cumulative_stats_file           = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["cumulative_stats_file"]
+    cumulative_stats_file_largest_cc = configuration["statistics_out_basedir"] + "/" + configuration["structural_statistics"]["outputs"]["cumulative_stats_file_largest_cc"]
+    if cumulative_snapshot_directory:
+        cumulative_snapshot_directory = configuration["workflow_data"] + "/" + configuration["country"] + "/" + cumulative_snapshot_directory
+    years_directory                 = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["temporal_edges"]["years_directory"]
+    store_directory                 = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["temporal_edges"]["store_directory"]
     os.makedirs(configuration["statistics_out_basedir"], exist_ok=True)
 except Exception as e:
     print("Error: key {} not found".format(e))
@@ -28,8 +44,54 @@ print(f"  Graph Directory:          {graph_directory}")
 print(f"\n[ANALYSIS OUTPUTS]")
 print(f"  General Stats File:       {output_stats_file}")
 print(f"  Largest CC Stats File:    {output_stats_file_largest_cc}")
+if rolling:
+    print(f"  Rolling Stats File:       {rolling_stats_file}")
+    print(f"  Rolling Largest CC File:  {rolling_stats_file_largest_cc}")
+if cumulative:
+    print(f"  Cumulative Stats File:    {cumulative_stats_file}")
+    print(f"  Cumulative Largest CC:    {cumulative_stats_file_largest_cc}")
+    if cumulative_snapshot_directory:
+        print(f"  Cumulative Snapshots:     {cumulative_snapshot_directory}")
+
+# --- Parameters ---
+print(f"\n[PARAMETERS]")
+print(f"  Streaming (out of core):  {streaming}")
+if streaming:
+    print(f"  Chunk Size:               {chunk_size}")
+    print(f"  Work Directory:           {work_directory or 'system temporary directory'}")
+print(f"  Rolling Windows:          {f'{rolling_window} years, step {rolling_step}' if rolling else 'disabled'}")
+print(f"  Cumulative Snapshots:     {cumulative}")
+if rolling or cumulative:
+    print(f"  Temporal Edge Store:      {store_directory}")
 
 print(f"\n{'='*60}\n")
 
-from compute_structural_statistics import run
-run(graph_directory, output_stats_file, output_stats_file_largest_cc, False)
\ No newline at end of file
+import run_ledger
+run_ledger.configure(configuration, "02_graph_structural_statistics")
+
+from compute_structural_statistics import run, append_stats
+run(graph_directory, output_stats_file, output_stats_file_largest_cc, False, streaming, chunk_size, work_directory)
+
+if rolling or cumulative:
+    from temporal_edges import open_store
+    store = open_store(store_directory, years_directory, chunk_size)
+
+if rolling:
+    from rolling_statistics import rolling_structural_stats
+
+    with run_ledger.measure("rolling_windows", store_directory) as record:
+        record["edges"] = len(store)
+        for start, end, stats, largest_cc_stats in rolling_structural_stats(store, rolling_window, rolling_step, chunk_size):
+            print(f"Window {start}-{end}: {stats['number_of_nodes']} nodes, {stats['number_of_edges']} edges")
+            append_stats(stats, rolling_stats_file)
+            append_stats(largest_cc_stats, rolling_stats_file_largest_cc)
+
+if cumulative:
+    from cumulative_snapshots import cumulative_structural_stats
+
+    with run_ledger.measure("cumulative_snapshots", store_directory) as record:
+        record["edges"] = len(store)
+        for year, stats, largest_cc_stats in cumulative_structural_stats(store, cumulative_snapshot_directory, chunk_size):
+            print(f"As of {year}: {stats['number_of_nodes']} nodes, {stats['number_of_edges']} edges")
+            append_stats(stats, cumulative_stats_file)
+            append_stats(largest_cc_stats, cumulative_stats_file_largest_cc)
\ No newline at end of file
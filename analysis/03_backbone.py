@@ -9,6 +9,11 @@ with open(toml_config_path, 'rb') as f:
 try:
     input_networks_path     = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["backbones"]["inputs"]["graph_directory"]
     output_networks_path    = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["backbones"]["outputs"]["backbone_directory"]
+    decay_half_life         = configuration["backbones"]["config"]["decay_half_life"]
+    if decay_half_life:
+        years_directory     = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["temporal_edges"]["years_directory"]
+        store_directory     = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["temporal_edges"]["store_directory"]
+        time_intervals      = [tuple(interval) for interval in configuration["time_intervals"]]
 except Exception as e:
     print("Error: key {} not found".format(e))
     exit(-1)
@@ -19,12 +24,20 @@ print(f"{'=' * 60}")
 
 # --- Inputs ---
 print(f"\n[DATA SOURCE]")
-print(f"  Weighted Graph Directory:          {input_networks_path}")
+if decay_half_life:
+    print(f"  Temporal Edge Store:               {store_directory}")
+    print(f"  Time Intervals:                    {time_intervals}")
+else:
+    print(f"  Weighted Graph Directory:          {input_networks_path}")
 
 # --- Outputs ---
 print(f"\n[OUTPUTS]")
 print(f"  Bacbones output directory:    {output_networks_path}")
 
+# --- Parameters ---
+print(f"\n[PARAMETERS]")
+print(f"  Decay Half-Life:              {f'{decay_half_life} years' if decay_half_life else 'disabled (raw counts)'}")
+
 import networkx as nx
 import numpy as np
 import pandas as pd
@@ -45,7 +58,43 @@ def generate_bacbone(graph):
     
     return filtered_backbone_net
 
+def dump_backbone(data, output_file_name, record):
+    graph = nx.from_pandas_edgelist(data, source='author1', target='author2', edge_attr='weight', create_using=nx.Graph())
+    record["edges"] = graph.number_of_edges()
+
+    backbone_graph = generate_bacbone(graph)
+
+    g_data = nx.to_pandas_edgelist(backbone_graph)
+    g_data.to_csv(output_file_name, index=False)
+
+def decayed_backbones():
+    """Backbones of the time_intervals graphs with time-decayed weights, in one forward pass over the years."""
+    from temporal_edges import open_store
+    from time_decay import decayed_interval_weights
+
+    store = open_store(store_directory, years_directory)
+    for start, end, author1, author2, weights in decayed_interval_weights(store, time_intervals, decay_half_life):
+        graph_name = f"weighted_{start}_{end}_dataset"
+        output_file_name = f"{output_networks_path}/backbone_{graph_name}.csv"
+        print(f"Processing graph: {graph_name} (half-life {decay_half_life} years)")
+        if os.path.exists(output_file_name):
+            print(f"Backbone already computed for {graph_name}")
+            continue
+
+        print(f"Output path: {output_file_name}")
+        with run_ledger.measure(graph_name, store_directory) as record:
+            data = pd.DataFrame({'author1': [f"A{author}" for author in author1.tolist()],
+                                 'author2': [f"A{author}" for author in author2.tolist()],
+                                 'weight': weights})
+            dump_backbone(data, output_file_name, record)
+
 if __name__ == "__main__":
+    import run_ledger
+    run_ledger.configure(configuration, "03_backbone")
+
+    if decay_half_life:
+        decayed_backbones()
+        sys.exit(0)
 
     graphs_to_process = []
     
@@ -67,14 +116,9 @@ if __name__ == "__main__":
 
 
         print(f"Output path: {output_file_name}")
-        data = pd.read_csv(filename)
-        column_names = ['author1', 'author2', 'weight']
-        data.columns = column_names
-
-        graph = nx.from_pandas_edgelist(data, source='author1', target='author2', edge_attr='weight', create_using=nx.Graph())
-
-        backbone_graph = generate_bacbone(graph)
-
-        g_data = nx.to_pandas_edgelist(backbone_graph)
-        g_data.to_csv(output_file_name, index=False)
+        with run_ledger.measure(path, filename) as record:
+            data = pd.read_csv(filename)
+            column_names = ['author1', 'author2', 'weight']
+            data.columns = column_names
+            dump_backbone(data, output_file_name, record)
     
\ No newline at end of file
@@ -10,6 +10,9 @@ try:
     graph_directory                 = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["backbones"]["outputs"]["backbone_directory"]
     output_stats_file               = configuration["statistics_out_basedir"] + "/" + configuration["bacbone_structural_statistics"]["outputs"]["output_stats_file"]
     output_stats_file_largest_cc    = configuration["statistics_out_basedir"] + "/" + configuration["bacbone_structural_statistics"]["outputs"]["output_stats_file_largest_cc"]
+    streaming                       = configuration["bacbone_structural_statistics"]["config"]["streaming"]
+    chunk_size                      = configuration["bacbone_structural_statistics"]["config"]["chunk_size"]
+    work_directory                  = configuration["bacbone_structural_statistics"]["config"]["work_directory"]
     os.makedirs(configuration["statistics_out_basedir"], exist_ok=True)
 except Exception as e:
     print("Error: key {} not found".format(e))
@@ -28,7 +31,17 @@ print(f"\n[ANALYSIS OUTPUTS]")
 print(f"  General Stats File:       {output_stats_file}")
 print(f"  Largest CC Stats File:    {output_stats_file_largest_cc}")
 
+# --- Parameters ---
+print(f"\n[PARAMETERS]")
+print(f"  Streaming (out of core):  {streaming}")
+if streaming:
+    print(f"  Chunk Size:               {chunk_size}")
+    print(f"  Work Directory:           {work_directory or 'system temporary directory'}")
+
 print(f"\n{'='*60}\n")
 
+import run_ledger
+run_ledger.configure(configuration, "04_backbone_structural_statistics")
+
 from compute_structural_statistics import run
-run(graph_directory, output_stats_file, output_stats_file_largest_cc, True)
\ No newline at end of file
+run(graph_directory, output_stats_file, output_stats_file_largest_cc, True, streaming, chunk_size, work_directory)
\ No newline at end of file
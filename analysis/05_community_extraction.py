@@ -1,13 +1,17 @@
 import networkx as nx
 import os
 import numpy as np
-import pickle
+import re
 import csv
 from pathlib import Path
 
 
 import sys, tomllib
 
+import louvain
+import partition_store
+from parallel import process_pool
+
 toml_config_path = sys.argv[1] if len(sys.argv) > 1 else "default.toml"
 
 print("Parsing {} configuration file".format(toml_config_path))
@@ -18,6 +22,17 @@ try:
     input_graph_folder      = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["backbones"]["outputs"]["backbone_directory"]
     output_graph_folder     = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["community_extraction"]["outputs"]["communities_folder"]
     statistics_output_file  = configuration["statistics_out_basedir"] + "/" + configuration["community_extraction"]["outputs"]["statistics_output_file"]
+    community_engine        = configuration["community"]["engine"]
+    community_workers       = configuration["community"]["workers"]
+    per_component           = configuration["community_extraction"]["config"]["per_component"]
+    component_chunk_nodes   = configuration["community_extraction"]["config"]["component_chunk_nodes"]
+    store_hierarchy         = configuration["community_extraction"]["config"]["store_hierarchy"]
+    resolutions             = configuration["community_extraction"]["config"]["resolutions"]
+    sweep_quantiles         = configuration["community_flow"]["quantiles"]
+    sweep_output_file       = configuration["statistics_out_basedir"] + "/" + configuration["community_extraction"]["outputs"]["resolution_sweep_file"]
+    warm_start              = configuration["community_extraction"]["config"]["warm_start"]
+    compare_cold_start      = configuration["community_extraction"]["config"]["compare_cold_start"]
+    warm_start_output_file  = configuration["statistics_out_basedir"] + "/" + configuration["community_extraction"]["outputs"]["warm_start_statistics_file"]
     os.makedirs(configuration["statistics_out_basedir"], exist_ok=True)
 except Exception as e:
     print("Error: key {} not found".format(e))
@@ -35,6 +50,18 @@ print(f"  Graph Directory:        {input_graph_folder}")
 print(f"\n[COMMUNITY OUTPUTS]")
 print(f"  General Stats File:     {statistics_output_file}")
 print(f"  Community directory:    {output_graph_folder}")
+if warm_start and compare_cold_start:
+    print(f"  Warm Start Stats File:  {warm_start_output_file}")
+if resolutions:
+    print(f"  Resolution Sweep File:  {sweep_output_file}")
+
+# --- Parameters ---
+print(f"\n[PARAMETERS]")
+print(f"  Community Engine:       {community_engine}")
+print(f"  Warm Start:             {warm_start}")
+print(f"  Per Component:          {per_component}")
+print(f"  Store Hierarchy:        {store_hierarchy}")
+print(f"  Resolution Sweep:       {resolutions if resolutions else 'disabled'}")
 
 print(f"\n{'='*60}\n")
 
@@ -58,16 +85,106 @@ def load_collaboration_graph(path: str) -> nx.Graph:
 
 
 def find_communities(graph: nx.Graph, seed: int = 42) -> list:
-    communities = nx.community.louvain_communities(graph, weight="weight", seed=seed)
-    print("\tFound ", len(communities), " communities")
-    return communities
+    """
+    :return: every level of the Louvain dendrogram, from the finest to the coarsest (the
+             communities of the run), each a list of sets of authors
+    """
+    if per_component:
+        names, adjacency = louvain.csr_from_networkx(graph)
+        levels, n_components, n_cliques = louvain.louvain_by_component(
+            adjacency, seed=seed, workers=community_workers, chunk_nodes=component_chunk_nodes)
+        print(f"\t{n_components} connected components, {n_cliques} cliques")
+        levels = [louvain.communities_from_labels(names, labels) for labels in levels]
+    elif community_engine == "csr":
+        names, adjacency = louvain.csr_from_networkx(graph)
+        levels, _ = louvain.louvain_levels(adjacency, seed=seed)
+        levels = [louvain.communities_from_labels(names, labels) for labels in levels or [np.arange(len(names))]]
+    else:
+        levels = list(nx.community.louvain_partitions(graph, weight="weight", seed=seed))
+    print("\tFound ", len(levels[-1]), " communities in ", len(levels), " levels")
+    return levels
+
+
+def find_communities_warm(graph: nx.Graph, previous, seed: int = 42):
+    """
+    Louvain (csr engine) seeded with the communities of the authors shared with the previous
+    interval, new authors starting as singletons.
+    :param previous: (node names, community labels) of the previous interval, None for the first one
+    :return: (dendrogram levels as in find_communities, (node names, community labels) for the
+             next interval, warm start statistics or None)
+    """
+    names, adjacency = louvain.csr_from_networkx(graph)
+    initial_labels = louvain.seed_labels(names, *previous) if previous is not None else None
+    levels, sweeps = louvain.louvain_levels(adjacency, seed=seed, initial_labels=initial_labels)
+    levels = levels or [np.arange(len(names))]
+    labels = levels[-1]
+    print("\tFound ", labels.max() + 1 if len(labels) else 0, " communities in ", len(levels), " levels")
+
+    statistics = None
+    if previous is not None and compare_cold_start:
+        cold_levels, cold_sweeps = louvain.louvain_levels(adjacency, seed=seed)
+        cold_labels = cold_levels[-1] if cold_levels else np.arange(len(names))
+        shared = np.count_nonzero(np.isin(names, previous[0]))
+        statistics = [shared / len(names), sum(sweeps), sum(cold_sweeps), sum(cold_sweeps) - sum(sweeps),
+                      louvain.modularity(adjacency, labels), louvain.modularity(adjacency, cold_labels)]
+        print(f"\tWarm start: {sum(sweeps)} sweeps (cold start {sum(cold_sweeps)}), "
+              f"modularity {statistics[4]} (cold start {statistics[5]})")
+    return [louvain.communities_from_labels(names, level) for level in levels], (names, labels), statistics
+
+
+# graph shared with the forked workers of the resolution sweep
+sweep_graph = {}
+
+
+def sweep_run(resolution: float, seed: int = 42) -> list:
+    adjacency, strength = sweep_graph["adjacency"], sweep_graph["strength"]
+    levels, _ = louvain.louvain_levels(adjacency, seed=seed, resolution=resolution, strength=strength)
+    labels = levels[-1] if levels else np.arange(adjacency.shape[0])
+    sizes = np.bincount(labels)
+    return [resolution, louvain.modularity(adjacency, labels, resolution, strength),
+            louvain.modularity(adjacency, labels, 1.0, strength), len(sizes)] + np.percentile(sizes, sweep_quantiles).tolist()
+
 
+def sweep_resolutions(graph: nx.Graph) -> list:
+    """
+    csr Louvain at every configured resolution, in parallel on the same CSR graph.
+    :return: one row per resolution: resolution, modularity at that resolution, modularity at
+             resolution 1, number of communities and community size quantiles
+    """
+    _, adjacency = louvain.csr_from_networkx(graph)
+    sweep_graph.update(adjacency=adjacency, strength=louvain.node_strength(adjacency))
+    try:
+        with process_pool(community_workers) as pool:
+            rows = pool.map(sweep_run, resolutions)
+    finally:
+        sweep_graph.clear()
+    for resolution, resolution_modularity, modularity, n_communities, *_ in rows:
+        print(f"\tResolution {resolution}: {n_communities} communities, modularity {resolution_modularity} "
+              f"({modularity} at resolution 1)")
+    return rows
 
-def dump_communities(communities: list, output_path: str):
 
-    with open(output_path, "wb") as f:
-        pickle.dump(communities, f)
-    print("\tCommunities dumped to: ", output_path)
+def dump_resolution_sweep(filename: str, rows: list, output_path: str):
+    dataset_name = filename.split("/")[-1].replace("_dataset_backbone.csv", "").replace(
+        "weighted_", ""
+    )
+
+    if not os.path.exists(output_path):
+        with open(output_path, "w") as f:
+            csv.writer(f).writerow(
+                ["dataset", "resolution", "modularity", "standard_modularity", "communities"]
+                + [f"size_q{q}" for q in sweep_quantiles]
+            )
+
+    with open(output_path, "a") as f:
+        writer = csv.writer(f)
+        for row in rows:
+            writer.writerow([dataset_name] + row)
+    print("\tResolution sweep dumped to: ", output_path)
+
+
+def dump_communities(levels: list, output_path: str):
+    partition_store.save_partitions(output_path, [levels[-1]], levels=levels if store_hierarchy else None)
 
 
 def dump_statistics(filename: str, statistics: list, output_path: str):
@@ -88,6 +205,23 @@ def dump_statistics(filename: str, statistics: list, output_path: str):
     print("\tStatistics dumped to: ", output_path)
 
 
+def dump_warm_start_statistics(filename: str, statistics: list, output_path: str):
+    dataset_name = filename.split("/")[-1].replace("_dataset_backbone.csv", "").replace(
+        "weighted_", ""
+    )
+
+    if not os.path.exists(output_path):
+        with open(output_path, "w") as f:
+            csv.writer(f).writerow(
+                ["dataset", "shared_authors", "warm_sweeps", "cold_sweeps", "sweeps_saved",
+                 "warm_modularity", "cold_modularity"]
+            )
+
+    with open(output_path, "a") as f:
+        csv.writer(f).writerow([dataset_name] + statistics)
+    print("\tWarm start statistics dumped to: ", output_path)
+
+
 def eval_conductance(graph, communities):
     conductance = np.zeros([len(communities), len(communities)])
     for i, comm_i in enumerate(communities):
@@ -99,8 +233,9 @@ def eval_conductance(graph, communities):
 
 
 def compute_statistics(graph, communities):
-    modularity = nx.community.modularity(graph, communities)
-    coverage, performance = nx.community.partition_quality(graph, communities)
+    names, sources, targets, weights = louvain.networkx_edges(graph)
+    labels = louvain.labels_from_communities(names, communities)
+    modularity, coverage, performance = louvain.partition_quality(len(names), sources, targets, weights, labels)
     conductance = np.mean(eval_conductance(graph, communities)).item()
     print(
         f"\tModularity: {modularity} - coverage: {coverage} - performance: {performance} - conductance: {conductance}"
@@ -109,10 +244,21 @@ def compute_statistics(graph, communities):
 
 
 if __name__ == "__main__":
-    
+    import run_ledger
+    run_ledger.configure(configuration, "05_community_extraction")
+
     files = sorted(
         os.listdir(input_graph_folder), key=lambda x: os.stat(os.path.join(input_graph_folder, x)).st_size
     )
+    if warm_start:
+        if community_engine != "csr":
+            print("Warm start requires the csr engine, using it for all intervals")
+        if per_component:
+            print("Warm start does not cluster components separately, ignoring per_component")
+        # consecutive intervals, in chronological order
+        interval_pattern = re.compile(r'_(\d{4})_(\d{4})_')
+        files = sorted(files, key=lambda x: interval_pattern.search(x).groups() if interval_pattern.search(x) else ("", ""))
+    previous_partition = None
     
     if output_graph_folder is None:
         output_graph_folder = input_graph_folder.replace("backbones", "communities")
@@ -127,11 +273,23 @@ if __name__ == "__main__":
         print("\n\n")
         file = input_graph_folder + "/" + file
         print(f"Processing file: {file}")
-        collab_graph = load_collaboration_graph(file)
-        communities = find_communities(collab_graph)
-        output_path = output_graph_folder + "/" + file.split("/")[-1].replace(".csv", "_communities.pkl")
-        dump_communities(communities, output_path)
-
-        print("Starting statistics computation...")
-        statistics = compute_statistics(collab_graph, communities)
-        dump_statistics(file, statistics=statistics, output_path=statistics_output_file)
+        with run_ledger.measure(file.split("/")[-1], file) as record:
+            collab_graph = load_collaboration_graph(file)
+            record["edges"] = collab_graph.number_of_edges()
+            if warm_start:
+                levels, previous_partition, warm_statistics = find_communities_warm(collab_graph, previous_partition)
+                if warm_statistics is not None:
+                    dump_warm_start_statistics(file, warm_statistics, warm_start_output_file)
+            else:
+                levels = find_communities(collab_graph)
+            communities = levels[-1]
+            output_path = output_graph_folder + "/" + file.split("/")[-1].replace(".csv", "_communities" + partition_store.PARTITION_EXTENSION)
+            dump_communities(levels, output_path)
+
+            if resolutions:
+                print("Starting resolution sweep...")
+                dump_resolution_sweep(file, sweep_resolutions(collab_graph), sweep_output_file)
+
+            print("Starting statistics computation...")
+            statistics = compute_statistics(collab_graph, communities)
+            dump_statistics(file, statistics=statistics, output_path=statistics_output_file)
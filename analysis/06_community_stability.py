@@ -1,13 +1,18 @@
 import networkx as nx
 import numpy as np
 import os
-import pickle
 from pathlib import Path
 import csv
 import datetime
+import scipy.stats
 from sklearn.metrics import adjusted_mutual_info_score, normalized_mutual_info_score
 import sys, tomllib
 
+import consensus
+import louvain
+import partition_store
+from parallel import process_pool, worker_count
+
 toml_config_path = sys.argv[1] if len(sys.argv) > 1 else "default.toml"
 
 print("Parsing {} configuration file".format(toml_config_path))
@@ -19,6 +24,13 @@ try:
     communities_output_folder   = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["community_stability"]["outputs"]["communities_output_folder"]
     statistics_output_file      = configuration["statistics_out_basedir"] + "/" + configuration["community_stability"]["outputs"]["statistics_output_file"]
     RUNS                        = configuration["community_stability"]["RUNS"]
+    adaptive_runs               = configuration["community_stability"]["adaptive"]
+    ci_width                    = configuration["community_stability"]["ci_width"]
+    MAX_RUNS                    = configuration["community_stability"]["max_runs"]
+    consensus_enabled           = configuration["community_stability"]["consensus"]
+    consensus_threshold         = configuration["community_stability"]["consensus_threshold"]
+    community_engine            = configuration["community"]["engine"]
+    workers                     = configuration["community"]["workers"]
     os.makedirs(configuration["statistics_out_basedir"], exist_ok=True)
 except Exception as e:
     print("Error: key {} not found".format(e))
@@ -31,6 +43,10 @@ print(f"{'='*60}")
 # --- Execution Parameters ---
 print(f"\n[EXECUTION]")
 print(f"  Iteration Runs:           {RUNS}")
+if adaptive_runs:
+    print(f"  Adaptive Runs:            up to {MAX_RUNS}, until the NMI/AMI 95% CI is narrower than {ci_width}")
+print(f"  Community Engine:         {community_engine}")
+print(f"  Consensus Partition:      {consensus_enabled}" + (f" (threshold {consensus_threshold})" if consensus_enabled else ""))
 
 # --- Inputs ---
 print(f"\n[INPUTS]")
@@ -55,14 +71,13 @@ def load_collaboration_graph(path: str) -> nx.Graph:
     print("\tGraph has: ", collab_graph.number_of_nodes(), " nodes and ", collab_graph.number_of_edges(), " edges")
     return collab_graph
 
-def dump_communities(communities: list, output_path: str):
+def dump_communities(communities: list, output_path: str, consensus: list = None):
     
     if not os.path.exists(os.path.dirname(output_path)):
         os.makedirs(os.path.dirname(output_path))
-        
-    with open(output_path, 'wb') as f:
-        pickle.dump(communities, f)
-    print("\tCommunities dumped to: ", output_path)
+
+    # one label column per run, plus the consensus column
+    partition_store.save_partitions(output_path, communities, consensus)
     
 def find_communities(graph, runs):
     communities = []
@@ -71,9 +86,30 @@ def find_communities(graph, runs):
         communities.append(nx.community.louvain_communities(graph,  weight='weight', seed=datetime.datetime.now().microsecond))
     return communities
 
-def eval_stability(communities):
+csr_graph = {}
+
+def csr_louvain_run(seed):
+    return louvain.louvain_communities(csr_graph["names"], csr_graph["adjacency"], seed=seed)
+
+def find_communities_csr(names, adjacency, runs):
+    # the graph is inherited by the forked workers instead of being sent with every run
+    csr_graph.update(names=names, adjacency=adjacency)
+    # fresh entropy for every run, as the networkx runs are seeded with the current time
+    seeds = np.random.SeedSequence().generate_state(runs).tolist()
+    with process_pool(workers) as pool:
+        return pool.map(csr_louvain_run, seeds)
+
+def find_consensus(names, adjacency, partitions):
+    labels = consensus.consensus_partition(adjacency, consensus.run_labels(names, partitions), consensus_threshold)
+    communities = louvain.communities_from_labels(names, labels)
+    print(f"\tConsensus partition: {len(communities)} communities, modularity {louvain.modularity(adjacency, labels)}")
+    return communities
+
+def eval_stability(communities, cache=None):
     """
     TL;DR:NMI requires that communities are node labels (i.e., assignments) rather than lists of nodes
+    cache: optional dictionary keeping the scores of the pairs already evaluated, keyed by the pair
+    and by the number of communities kept in every partition (see get_bigger_communities)
     """
     # First, we convert communities to "node labels"
     community_labels = []
@@ -91,6 +127,11 @@ def eval_stability(communities):
     adj_nmi_values = []
     for i in range(len(community_labels)):
         for j in range(i+1, len(community_labels)):
+            key = (i, j, len(communities[i]))
+            if cache is not None and key in cache:
+                nmi_values.append(cache[key][0])
+                adj_nmi_values.append(cache[key][1])
+                continue
             # We first keep only nodes that are present in both runs
             common_nodes = set(community_labels[i].keys()) & set(community_labels[j].keys())
             # We then filter the communities to only include the common nodes
@@ -100,9 +141,45 @@ def eval_stability(communities):
             nmi_values.append(normalized_mutual_info_score(labels_i, labels_j))
             # We also evaluate the adjusted NMI
             adj_nmi_values.append(adjusted_mutual_info_score(labels_i, labels_j))
+            if cache is not None:
+                cache[key] = (nmi_values[-1], adj_nmi_values[-1])
 
     return nmi_values, adj_nmi_values
 
+def confidence_interval_width(values, confidence=0.95):
+    """
+    Width of the Student t interval of the mean pairwise score, from the R runs rather than the
+    R(R-1)/2 pairs: the scores that share a run are correlated, so the standard error is the
+    jackknife one, over the mean of the pairs left when every run is left out in turn.
+    values: pairwise scores in the order of eval_stability (i < j, row by row)
+    """
+    values = np.asarray(values, dtype=float)
+    runs = int(round((1 + np.sqrt(1 + 8 * len(values))) / 2))
+    if runs < 3:
+        return np.inf
+    scores = np.zeros((runs, runs))
+    scores[np.triu_indices(runs, 1)] = values
+    scores += scores.T
+    leave_out = (values.sum() - scores.sum(axis=1)) / ((runs - 1) * (runs - 2) / 2)
+    standard_error = np.sqrt((runs - 1) / runs * np.sum((leave_out - leave_out.mean()) ** 2))
+    return 2 * scipy.stats.t.ppf((1 + confidence) / 2, runs - 1) * standard_error
+
+def find_communities_adaptive(run_batch, batch_size):
+    """
+    Launch batches of runs until the confidence intervals of the mean NMI and adjusted NMI are
+    narrower than ci_width, or MAX_RUNS runs have been made.
+    run_batch: function returning the partitions of a given number of new runs
+    """
+    partitions = run_batch(max(RUNS, 3))
+    cache = {}
+    while True:
+        nmis, adj_nmis = eval_stability(get_bigger_communities(partitions, min_size=1), cache)
+        width = max(confidence_interval_width(nmis), confidence_interval_width(adj_nmis))
+        print(f"\t{len(partitions)} runs: mean NMI {np.mean(nmis):.4f}, ADJ_NMI {np.mean(adj_nmis):.4f}, CI width {width:.4f}")
+        if width <= ci_width or len(partitions) >= MAX_RUNS:
+            return partitions, nmis, adj_nmis
+        partitions += run_batch(min(batch_size, MAX_RUNS - len(partitions)))
+
 def get_bigger_communities(communities, min_size = 20):
     # first the bigger communities
     bigger_communities_per_partition = [list(filter(lambda x: len(x) > min_size, part)) for part in communities]
@@ -120,13 +197,27 @@ def get_bigger_communities(communities, min_size = 20):
 
     return to_return
 
+STATISTICS_HEADER = ['dataset', 'NMI', 'ADJ_NMI', 'RUNS']
+
+def upgrade_statistics_file(output_path: str):
+    """Add an empty RUNS column to a statistics file written before the number of runs was recorded."""
+    with open(output_path, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    if not rows or rows[0] != STATISTICS_HEADER[:3]:
+        return
+    with open(output_path, 'w', newline='') as f:
+        csv.writer(f).writerows([STATISTICS_HEADER] + [row + [''] for row in rows[1:]])
+    print("\tAdded the RUNS column to: ", output_path)
+
 def dump_statistics(filename: str, statistics: list, output_path: str):
     dataset_name = filename.replace("_dataset_backbone.csv", "").replace("weighted_", "")
     
     if not os.path.exists(output_path):
         with open(output_path, 'w') as f:
-            csv.writer(f).writerow(['dataset', 'NMI', 'ADJ_NMI'])
+            csv.writer(f).writerow(STATISTICS_HEADER)
             f.write("")
+    else:
+        upgrade_statistics_file(output_path)
     
     with open(output_path, 'a') as f:
         csv.writer(f).writerow([dataset_name] + statistics)
@@ -135,6 +226,9 @@ def dump_statistics(filename: str, statistics: list, output_path: str):
     
 
 if __name__ == "__main__":
+    import run_ledger
+    run_ledger.configure(configuration, "06_community_stability")
+
     files = os.listdir(input_graph_folder)
     files.sort()
     
@@ -148,18 +242,39 @@ if __name__ == "__main__":
         if not file.name.endswith(".csv"):
             continue
         path = os.path.join(input_graph_folder, file) 
-        collab_graph = load_collaboration_graph(path)
-        collab_graph.__networkx_cache__ = None
+        with run_ledger.measure(file.name, path) as record:
+            if community_engine == "csr":
+                print("Loading file: ", path)
+                names, adjacency = louvain.load_csr_graph(path)
+                record["edges"] = louvain.edge_count(adjacency)
+                if adaptive_runs:
+                    partitions, nmis, adj_nmis = find_communities_adaptive(
+                        lambda runs: find_communities_csr(names, adjacency, runs), worker_count(workers)
+                    )
+                else:
+                    partitions = find_communities_csr(names, adjacency, RUNS)
+            else:
+                collab_graph = load_collaboration_graph(path)
+                collab_graph.__networkx_cache__ = None
+                record["edges"] = collab_graph.number_of_edges()
 
-        partitions = find_communities(collab_graph, RUNS)
-        
-        output_file_name = f"{communities_output_folder}/{file.name.replace('.csv', '_multiple_communities.pkl')}"
-        
-        dump_communities(partitions, output_file_name)
-        
-        filtered_partitions = get_bigger_communities(partitions, min_size=1)
-        nmis, adj_nmis = eval_stability(filtered_partitions)
-        dump_statistics(file.name, statistics=[np.mean(nmis).item(), np.mean(adj_nmis).item()], output_path=statistics_output_file)
+                if adaptive_runs:
+                    partitions, nmis, adj_nmis = find_communities_adaptive(lambda runs: find_communities(collab_graph, runs), 1)
+                else:
+                    partitions = find_communities(collab_graph, RUNS)
+                if consensus_enabled:
+                    names, adjacency = louvain.csr_from_networkx(collab_graph)
+
+            consensus_communities = find_consensus(names, adjacency, partitions) if consensus_enabled else None
+
+            output_file_name = f"{communities_output_folder}/{file.name.replace('.csv', '_multiple_communities' + partition_store.PARTITION_EXTENSION)}"
+
+            dump_communities(partitions, output_file_name, consensus_communities)
+
+            if not adaptive_runs:
+                filtered_partitions = get_bigger_communities(partitions, min_size=1)
+                nmis, adj_nmis = eval_stability(filtered_partitions)
+            dump_statistics(file.name, statistics=[np.mean(nmis).item(), np.mean(adj_nmis).item(), len(partitions)], output_path=statistics_output_file)
         
 
 
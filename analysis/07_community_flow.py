@@ -1,4 +1,3 @@
-import pickle
 import os
 import re
 import numpy as np
@@ -11,6 +10,10 @@ from functools import reduce
 import tomllib
 import sys
 
+import pair_index
+import partition_store
+import profiling
+
 
 toml_config_path = sys.argv[1] if len(sys.argv) > 1 else "default.toml"
 print("Parsing {} configuration file".format(toml_config_path))
@@ -23,10 +26,19 @@ try:
     size_statistics_path            = configuration["statistics_out_basedir"] + "/" + configuration["community_flow"]["outputs"]["size_statistics_path"]
     quantiles                       = configuration["community_flow"]["quantiles"]
     flow_percentile                 = configuration["community_flow"]["flow_percentile"]
+    flow_partition                  = configuration["community_flow"]["partition"]
     dataset_metadata_file_path      = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["metadata_analisys"]["inputs"]["metadata_path"]
     graph_paths                     = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["metadata_analisys"]["inputs"]["graph_directory"]
-    community_pickle_directory      = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["community_stability"]["outputs"]["communities_output_folder"]
+    community_partition_directory   = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["community_stability"]["outputs"]["communities_output_folder"]
     comm_labels_out_path            = configuration["workflow_data"] + "/" + configuration["country"] + "/" + configuration["community_extraction"]["outputs"]["communities_folder"]
+    if partition_store.is_level(flow_partition):
+        # dendrogram levels are stored by the extraction step
+        community_partition_directory = comm_labels_out_path
+        comm_labels_out_path = os.path.join(comm_labels_out_path, flow_partition)
+        os.makedirs(comm_labels_out_path, exist_ok=True)
+        statistics_out_basedir = os.path.join(statistics_out_basedir, flow_partition)
+        size_statistics_path = os.path.join(statistics_out_basedir, configuration["community_flow"]["outputs"]["size_statistics_path"])
+        os.makedirs(statistics_out_basedir, exist_ok=True)
 except Exception as e:
     print("Error: key {} not found".format(e))
     exit(-1)
@@ -45,7 +57,7 @@ print(f"{'=' * 60}")
 print(f"\n[INPUTS]")
 print(f"  Dataset Metadata:     {dataset_metadata_file_path}")
 print(f"  Graphs Directory:     {graph_paths}")
-print(f"  Communities Pickle:   {community_pickle_directory}")
+print(f"  Communities:          {community_partition_directory} ({flow_partition})")
 
 print(f"\n[SETTINGS]")
 print(f"  Display Sink Comm.:   {display_sink_community}")
@@ -61,7 +73,9 @@ print(f"{'=' * 60}\n")
     
 
 def load_works(start_year, end_year, graph_paths):
-    works = dict()
+    """
+    :return: pair_index.PairIndex of the works of every author pair of the interval graph
+    """
     end_year = end_year if end_year != "*" else ""
     tmp = glob.glob(f"{graph_paths}/{start_year}_{end_year}*.csv")
     if len(tmp) == 0:
@@ -70,36 +84,15 @@ def load_works(start_year, end_year, graph_paths):
 
     community_graph_file_path = tmp[0]
     
-    # Load the graph source file to find works associated with the community
-    with open(community_graph_file_path, "r") as f:
-        next(f)
-        for line in f:
-            parts = line.strip().split(",")
-            work_id = parts[1]
-            author1 = parts[2]
-            author2 = parts[3]
-            
-            first_author = author1 if author1 < author2 else author2
-            second_author = author2 if author1 < author2 else author1
-  
-            
-            if first_author not in works:
-                works[first_author] = dict()
-            
-            works[first_author][second_author] = work_id 
+    with profiling.profile("load_works"):
+        # Load the graph source file to find works associated with the community
+        works = pair_index.load_pair_index(community_graph_file_path, skip_first_line=True)
     print("Loaded works for community.")
     return works
 
 def get_works_from_community(community, works):
-    community_works = set()
-    for author1 in community:
-        for author2 in community:
-            first_author = author1 if author1 < author2 else author2
-            second_author = author2 if author1 < author2 else author1
-            if first_author != second_author and first_author in works and second_author in works[first_author]:
-                community_works.add(works[first_author][second_author])
-                
-    return community_works
+    community_works = works.community_works(partition_store.author_ids(community))
+    return {f"W{work}" for work in community_works.tolist()}
 
 def match_community_works_to_topics(community_works, metadata_file):
     topics = {}
@@ -127,19 +120,14 @@ def load_communities(community_directory: str) -> dict:
     pattern = re.compile(r'_(\d{4})?_(\d{4})?_')
     print(f"Loading communities from directory: {community_directory}")
     for file in os.listdir(community_directory):
-        if file.endswith(".pkl"):
-            with open(os.path.join(community_directory, file), "rb") as f:
-                match = pattern.search(file)
-                if match:
-                    start_year, end_year = match.groups()
-                    key = f"{start_year if start_year else '*'}-{end_year if end_year else '*'}"
-                    loaded_data = pickle.load(f)
-                    # if loading communities from stability computatino get the first computed communities, otherwise load directly the data
-                    if isinstance(loaded_data, list):
-                        loaded_communities[key] = loaded_data[0]
-                    else:
-                        loaded_communities[key] = loaded_data
-                    print(f"\t {key}: {len(loaded_communities[key])} communities.")
+        if file.endswith(partition_store.PARTITION_EXTENSION):
+            match = pattern.search(file)
+            if match:
+                start_year, end_year = match.groups()
+                key = f"{start_year if start_year else '*'}-{end_year if end_year else '*'}"
+                # only the configured run (or the consensus) is read from the stability partitions
+                loaded_communities[key] = partition_store.load_partition(os.path.join(community_directory, file), run=flow_partition)
+                print(f"\t {key}: {len(loaded_communities[key])} communities.")
     print("All communities loaded.")
     return loaded_communities
 
@@ -190,7 +178,10 @@ def find_overlap(comm1, comm2, normalized=False):
     return len(set(comm1).intersection(set(comm2)))
 
 if __name__ == "__main__":
-    communities = load_communities(community_pickle_directory)
+    import run_ledger
+    run_ledger.configure(configuration, "07_community_flow")
+
+    communities = load_communities(community_partition_directory)
     community_size_distribution(communities, quantiles, size_statistics_path)
     
     flow_communities = dict()
@@ -200,12 +191,14 @@ if __name__ == "__main__":
     
         percentile_communities, sink_communities = get_commununity_over_percentile(community, start_year, end_year, percentile=flow_percentile)
         communities_works={}
-        loaded_works = load_works(start_year, end_year, graph_paths)
-        with alive_progress.alive_bar(len(percentile_communities), title=f"Processing community for dataset starting at {start_year}") as bar:
-            for community_id, community_authors in enumerate(percentile_communities):
-                works = get_works_from_community(community_authors, loaded_works)
-                communities_works[community_id] = match_community_works_to_topics(works, dataset_metadata_file_path)
-                bar()
+        with run_ledger.measure(f"{start_year}_{end_year}") as record:
+            loaded_works = load_works(start_year, end_year, graph_paths)
+            record["edges"] = len(loaded_works)
+            with alive_progress.alive_bar(len(percentile_communities), title=f"Processing community for dataset starting at {start_year}") as bar:
+                for community_id, community_authors in enumerate(percentile_communities):
+                    works = get_works_from_community(community_authors, loaded_works)
+                    communities_works[community_id] = match_community_works_to_topics(works, dataset_metadata_file_path)
+                    bar()
             
         output_file = f"{comm_labels_out_path}/topic_distribution_{start_year}_{end_year}.json".replace("*", "")
         json.dump(communities_works, open(output_file, "w"))
@@ -32,6 +32,9 @@ try:
 except KeyError as e:
     raise RuntimeError(f"Missing config key: {e}")
 
+import run_ledger
+run_ledger.configure(cfg, "08_graphs_property_validation")
+
 def load_collaboration_graph(path: str) -> nx.Graph:
     print("Loading file: ", path)
     collab_graph = nx.Graph()
@@ -87,11 +90,9 @@ def compute_structural_stats(graph, graph_name):
     return stats
 
 
-for bacbone_name in os.listdir(bacbones_path):
-    print(f"Analizing backbone {bacbone_name}")
-    
-    bacbone = bacbones_path + "/" + bacbone_name
+def validate_backbone(bacbone_name, bacbone, record):
     graph = load_collaboration_graph(bacbone)
+    record["edges"] = graph.number_of_edges()
     degree_sequence = [d for _,d in graph.degree()]
     
     print(f"Executing analisis on {bacbone_name} with {iterations} iterations")
@@ -134,7 +135,14 @@ for bacbone_name in os.listdir(bacbones_path):
         average_stats.to_csv(output_stats_filename_random, index=False)
     else:
         average_stats.to_csv(output_stats_filename_random, mode='a', header=False, index=False)
+
+
+for bacbone_name in os.listdir(bacbones_path):
+    print(f"Analizing backbone {bacbone_name}")
     
+    bacbone = bacbones_path + "/" + bacbone_name
+    with run_ledger.measure(bacbone_name, bacbone) as record:
+        validate_backbone(bacbone_name, bacbone, record)
 
     
 print(f"Stored random generated stats to {output_stats_filename_random}")
@@ -31,6 +31,9 @@ try:
 except KeyError as e:
     raise RuntimeError(f"Missing config key: {e}")
 
+import run_ledger
+run_ledger.configure(cfg, "09_generate_plots")
+
 
 def dataset_sort_key(name: str): 
     if re.search(r'(\d{4})_(\d{4})$', name): 
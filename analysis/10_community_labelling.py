@@ -8,6 +8,9 @@ import matplotlib.pyplot as plt
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 
+import partition_store
+import run_ledger
+
 
 # ============================================================
 # Global Model (loaded once for speed)
@@ -103,10 +106,16 @@ def main():
             / cfg["country"]
             / cfg["community_extraction"]["outputs"]["communities_folder"]
         )
+        flow_partition = cfg["community_flow"]["partition"]
+        if partition_store.is_level(flow_partition):
+            # topic distributions of a dendrogram level (step 07), labelled in their own subfolder
+            communities_folder /= flow_partition
+            base_dir /= flow_partition
     except KeyError as e:
         raise RuntimeError(f"Missing config key: {e}")
 
     base_dir.mkdir(parents=True, exist_ok=True)
+    run_ledger.configure(cfg, "10_community_labelling")
 
     topics = collect_topics(communities_folder)
     topic_map = {topic: idx for idx, topic in enumerate(topics)}
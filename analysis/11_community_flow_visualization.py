@@ -1,4 +1,3 @@
-import pickle
 import os
 import re
 import numpy as np
@@ -10,6 +9,8 @@ from functools import reduce
 import tomllib
 import sys
 
+import partition_store
+
 # --- CONFIGURATION LOADING ---
 toml_config_path = sys.argv[1] if len(sys.argv) > 1 else "default.toml"
 print(f"Parsing {toml_config_path} configuration file")
@@ -19,7 +20,13 @@ with open(toml_config_path, 'rb') as f:
 try:
     statistics_out_basedir          = configuration["statistics_out_basedir"]
     flow_percentile                 = configuration["community_flow"]["flow_percentile"]
-    community_pickle_directory      = os.path.join(configuration["workflow_data"], configuration["country"], configuration["community_stability"]["outputs"]["communities_output_folder"])
+    flow_partition                  = configuration["community_flow"]["partition"]
+    community_partition_directory   = os.path.join(configuration["workflow_data"], configuration["country"], configuration["community_stability"]["outputs"]["communities_output_folder"])
+    if partition_store.is_level(flow_partition):
+        # dendrogram levels are stored by the extraction step, the labels of step 10 are in their subfolder
+        community_partition_directory = os.path.join(configuration["workflow_data"], configuration["country"], configuration["community_extraction"]["outputs"]["communities_folder"])
+        statistics_out_basedir = os.path.join(statistics_out_basedir, flow_partition)
+        os.makedirs(statistics_out_basedir, exist_ok=True)
 except Exception as e:
     print(f"Error: key {e} not found")
     exit(-1)
@@ -33,14 +40,12 @@ def load_communities(community_directory: str) -> dict:
     loaded_communities = {}
     pattern = re.compile(r'_(\d{4})?_(\d{4})?_')
     for file in os.listdir(community_directory):
-        if file.endswith(".pkl"):
-            with open(os.path.join(community_directory, file), "rb") as f:
-                match = pattern.search(file)
-                if match:
-                    start_year, end_year = match.groups()
-                    key = f"{start_year if start_year else '*'}-{end_year if end_year else '*'}"
-                    data = pickle.load(f)
-                    loaded_communities[key] = data[0] if isinstance(data, list) else data
+        if file.endswith(partition_store.PARTITION_EXTENSION):
+            match = pattern.search(file)
+            if match:
+                start_year, end_year = match.groups()
+                key = f"{start_year if start_year else '*'}-{end_year if end_year else '*'}"
+                loaded_communities[key] = partition_store.load_partition(os.path.join(community_directory, file), run=flow_partition)
     return loaded_communities
 
 def get_label_for_community(start, end, rank_idx):
@@ -77,7 +82,10 @@ def draw_sankey_flow(ax, x1, x2, y1_start, y1_end, y2_start, y2_end, color):
 
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
-    all_communities = load_communities(community_pickle_directory)
+    import run_ledger
+    run_ledger.configure(configuration, "11_community_flow_visualization")
+
+    all_communities = load_communities(community_partition_directory)
     flow_communities = {}
     
     # Pre-process: Filter and Rank
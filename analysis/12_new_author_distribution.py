@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 """
 For each CSV file (id1,id2,count) in the input directory:
-  - Track which file each ID appears in first
+  - Track which file each ID appears in first (as sorted int64 id arrays)
   - Calculate Total New IDs and Average New IDs per year
   - Plot both on the SAME scale (single Y-axis)
+  - Store the retention of every entry cohort in the later intervals (cohort x interval CSV)
 """
 
 import os
@@ -15,6 +16,11 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 
+import numpy as np
+import pandas as pd
+
+from author_cohorts import distinct_authors_per_file, new_authors_per_file, cohort_retention
+
 
 def parse_years(filename: str) -> tuple[int, int, int]:
     """Returns (start_year, end_year, duration)."""
@@ -43,11 +49,12 @@ def label_from_filename(filename: str) -> str:
 
 def main():
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <input_directory> [<output_pdf_path>]")
+        print(f"Usage: {sys.argv[0]} <input_directory> [<output_pdf_path>] [<retention_csv_path>]")
         sys.exit(1)
 
     input_dir = sys.argv[1]
     pdf_path = sys.argv[2] if len(sys.argv) > 2 else "new_authors_per_interval.pdf"
+    retention_path = sys.argv[3] if len(sys.argv) > 3 else "cohort_retention.csv"
 
     files = sorted(
         glob.glob(os.path.join(input_dir, "*.csv")),
@@ -58,24 +65,17 @@ def main():
         print(f"No .csv files found in '{input_dir}'")
         sys.exit(1)
 
-    first_seen = {}
+    # distinct author ids of every interval, parsed in parallel, then resolved in interval order
+    author_sets = distinct_authors_per_file(files)
+    new_authors = new_authors_per_file(author_sets)
     results = []
 
-    for filepath in files:
+    for filepath, new in zip(files, new_authors):
         filename = os.path.basename(filepath)
         label = label_from_filename(filename)
         _, _, duration = parse_years(filename)
-        new_ids_count = 0
-
-        with open(filepath, "r") as f:
-            for line in f:
-                parts = line.strip().split(",")
-                if len(parts) < 2: continue
-                for id_ in (parts[0].strip(), parts[1].strip()):
-                    if id_ not in first_seen:
-                        first_seen[id_] = filename
-                        new_ids_count += 1
-        
+        new_ids_count = len(new)
+
         results.append({
             "label": label, 
             "total": new_ids_count, 
@@ -84,6 +84,13 @@ def main():
 
     # Data for plotting
     labels = [r["label"] for r in results]
+
+    # Cohort retention: fraction of each interval's new authors still active in the later intervals
+    retention = cohort_retention(author_sets, new_authors)
+    retention_df = pd.DataFrame(retention, index=labels, columns=labels)
+    retention_df.insert(0, "cohort_size", [len(new) for new in new_authors])
+    retention_df.to_csv(retention_path, index_label="cohort")
+    print(f"Cohort retention saved to: {retention_path}")
     totals = [r["total"] for r in results]
     averages = [r["avg"] for r in results]
 
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from parallel import process_pool
+
+
+def read_author_ids(path: str) -> np.ndarray:
+    """
+    Read the two author columns of an edge list ("A123,A456,...") as int64 ids.
+    Lines whose author columns are not OpenAlex author ids (e.g. headers) are ignored.
+    """
+    df = pd.read_csv(path, header=None, usecols=[0, 1], names=["author1", "author2"], dtype=str)
+    ids = pd.concat([df["author1"], df["author2"]], ignore_index=True).str.strip().str.lstrip("A")
+    ids = pd.to_numeric(ids, errors="coerce").dropna()
+    return ids.to_numpy(dtype=np.int64)
+
+
+def distinct_authors(path: str) -> np.ndarray:
+    """Sorted array of the distinct author ids of an edge list."""
+    return np.unique(read_author_ids(path))
+
+
+def distinct_authors_per_file(paths: list, workers: int = 0) -> list:
+    """
+    Distinct author ids of every file, computed in parallel worker processes.
+    :return: list of sorted int64 arrays, in the same order as paths
+    """
+    with process_pool(workers) as pool:
+        return pool.map(distinct_authors, paths)
+
+
+def isin_sorted(values: np.ndarray, sorted_array: np.ndarray) -> np.ndarray:
+    """Membership mask of values in a sorted array, by binary search."""
+    if len(sorted_array) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_array, values), len(sorted_array) - 1)
+    return sorted_array[idx] == values
+
+
+def new_authors_per_file(author_sets: list) -> list:
+    """
+    Authors seen for the first time in each file, following the order of author_sets.
+    The authors seen so far are kept as a single sorted int64 array.
+    :param author_sets: sorted distinct author ids of every file
+    :return: list of sorted int64 arrays with the new authors of every file
+    """
+    seen = np.empty(0, dtype=np.int64)
+    new_authors = []
+    for authors in author_sets:
+        new = authors[~isin_sorted(authors, seen)]
+        new_authors.append(new)
+        seen = np.union1d(seen, new)
+    return new_authors
+
+
+def cohort_retention(author_sets: list, new_authors: list) -> np.ndarray:
+    """
+    Retention of every entry cohort: the cohort of interval i is made of the authors first
+    seen in interval i, and entry [i, j] is the fraction of that cohort active in interval j.
+    :param author_sets: sorted distinct author ids of every interval
+    :param new_authors: sorted new author ids of every interval (see new_authors_per_file)
+    :return: cohort x interval matrix, NaN for intervals before the cohort entry or empty cohorts
+    """
+    n = len(author_sets)
+    retention = np.full((n, n), np.nan)
+    for i, cohort in enumerate(new_authors):
+        if len(cohort) == 0:
+            continue
+        for j in range(i, n):
+            retention[i, j] = np.count_nonzero(isin_sorted(cohort, author_sets[j])) / len(cohort)
+    return retention
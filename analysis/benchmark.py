@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark of the analysis hot functions on synthetic datasets.
+
+For every scale (approximate number of edges) a synthetic dataset is generated once with
+synthetic_networks.py, then every case runs in its own interpreter so that its peak RSS is
+not polluted by the previous ones. Results are appended to a CSV file.
+
+Usage:
+  benchmark.py <datasets_dir> [--scales 1e4,1e5,1e6] [--cases eval_ccdf,...] [--output benchmark.csv]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+import partition_store
+import run_ledger
+from synthetic_networks import generate, parse_intervals
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+COUNTRY = "BENCH"
+INTERVALS = "1980-2009,2010-2011,2012-2013,2014-2015,2016-2020,2021-2025"
+
+
+def load_step(script_name: str, config_path: str):
+    """Import an analysis step script as a module, configured with config_path."""
+    argv = sys.argv
+    sys.argv = [script_name, config_path]
+    try:
+        spec = importlib.util.spec_from_file_location(f"step_{script_name[:2]}", os.path.join(ANALYSIS_DIR, script_name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.argv = argv
+    return module
+
+
+def write_config(dataset_root: str) -> str:
+    """Copy default.toml, pointing the workflow and statistics directories to the dataset."""
+    with open(os.path.join(ANALYSIS_DIR, "default.toml"), "r") as f:
+        config = f.read()
+    config = re.sub(r'(?m)^workflow_data = .*$', f'workflow_data = "{dataset_root}"', config)
+    config = re.sub(r'(?m)^country = .*$', f'country = "{COUNTRY}"', config)
+    config = re.sub(r'(?m)^statistics_out_basedir = .*$', f'statistics_out_basedir = "{dataset_root}/statistics"', config)
+
+    config_path = os.path.join(dataset_root, "benchmark.toml")
+    with open(config_path, "w") as f:
+        f.write(config)
+    return config_path
+
+
+def random_partition(nodes, k: int, seed: int) -> list:
+    rng = random.Random(seed)
+    communities = [set() for _ in range(k)]
+    for node in nodes:
+        communities[rng.randrange(k)].add(node)
+    return [c for c in communities if c]
+
+
+# ------------------------------------------------------------
+# Cases: each setup returns the callable to time
+# ------------------------------------------------------------
+def setup_compute_structural_stats(dataset, interval, config, args):
+    from compute_structural_statistics import compute_structural_stats, load_weighted_graph
+    graph = load_weighted_graph(f"{dataset}/nets_weighted/weighted_{interval}_dataset.csv")
+    return lambda: compute_structural_stats(graph, interval)
+
+
+def setup_eval_ccdf(dataset, interval, config, args):
+    import networkx as nx
+    from compute_structural_statistics import eval_ccdf
+    df = pd.read_csv(f"{dataset}/{interval}_dataset.csv", names=['year', 'work_id', 'author_id1', 'author_id2'])
+    graph = nx.from_pandas_edgelist(df, source='author_id1', target='author_id2')
+    return lambda: eval_ccdf(graph)
+
+
+def setup_eval_conductance(dataset, interval, config, args):
+    step = load_step("05_community_extraction.py", config)
+    graph = step.load_collaboration_graph(f"{dataset}/backbones/backbone_weighted_{interval}_dataset.csv")
+    communities = random_partition(graph.nodes(), args.communities, seed=0)
+    return lambda: step.eval_conductance(graph, communities)
+
+
+def setup_eval_stability(dataset, interval, config, args):
+    step = load_step("06_community_stability.py", config)
+    graph = step.load_collaboration_graph(f"{dataset}/backbones/backbone_weighted_{interval}_dataset.csv")
+    partitions = [random_partition(graph.nodes(), args.communities, seed=run) for run in range(args.runs)]
+    return lambda: step.eval_stability(partitions)
+
+
+def setup_get_works_from_community(dataset, interval, config, args):
+    step = load_step("07_community_flow.py", config)
+    start, end = interval.split("_")
+    works = step.load_works(start, end, dataset)
+    authors = partition_store.author_names(works.authors)
+    community = set(random.Random(0).sample(authors, min(args.community_size, len(authors))))
+    return lambda: step.get_works_from_community(community, works)
+
+
+def setup_find_overlap(dataset, interval, config, args):
+    step = load_step("07_community_flow.py", config)
+    df = pd.read_csv(f"{dataset}/nets_weighted/weighted_{interval}_dataset.csv", names=['author1', 'author2', 'weight'])
+    nodes = pd.unique(df[['author1', 'author2']].values.ravel()).tolist()
+    first, second = random_partition(nodes, 2, seed=0)[:2]
+    return lambda: step.find_overlap(first | set(list(second)[: len(second) // 2]), second, normalized=True)
+
+
+CASES = {
+    "compute_structural_stats": setup_compute_structural_stats,
+    "eval_ccdf": setup_eval_ccdf,
+    "eval_conductance": setup_eval_conductance,
+    "eval_stability": setup_eval_stability,
+    "get_works_from_community": setup_get_works_from_community,
+    "find_overlap": setup_find_overlap,
+}
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def run_case(case: str, dataset: str, interval: str, args) -> dict:
+    config = write_config(os.path.dirname(dataset))
+    function = CASES[case](dataset, interval, config, args)
+    setup_rss = current_rss_mb()
+    # the peak of the case only, not of the setup (graph loading)
+    peak_reset = run_ledger.reset_peak_rss()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    function()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    return {
+        "case": case,
+        "interval": interval,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": run_ledger.peak_rss_mb() if peak_reset else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot functions on synthetic datasets")
+    parser.add_argument("datasets_dir")
+    parser.add_argument("--scales", default="1e4,1e5,1e6", help="comma-separated approximate edge counts")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--interval", default=INTERVALS.split(",")[-1].replace("-", "_"),
+                        help="interval whose files are benchmarked, e.g. 2021_2025")
+    parser.add_argument("--communities", type=int, default=20, help="communities of the random partitions")
+    parser.add_argument("--runs", type=int, default=5, help="partitions compared by eval_stability")
+    parser.add_argument("--community-size", type=int, default=500, help="authors in the get_works_from_community community")
+    parser.add_argument("--output", default="benchmark.csv")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--dataset", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child process: run a single case and report on stdout
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.dataset, args.interval, args)))
+        return
+
+    results, failed = [], []
+    for scale in args.scales.split(","):
+        edges = int(float(scale))
+        dataset = os.path.join(os.path.abspath(args.datasets_dir), f"edges_{edges}", COUNTRY)
+        if not os.path.exists(os.path.join(dataset, "metadata_dataset.csv")):
+            print(f"Generating synthetic dataset with ~{edges} edges in {dataset}")
+            generate(dataset, edges, 1980, 2025, parse_intervals(INTERVALS))
+
+        for case in args.cases.split(","):
+            print(f"Running {case} on {edges} edges...")
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), args.datasets_dir, "--run-case", case,
+                 "--dataset", dataset, "--interval", args.interval, "--communities", str(args.communities),
+                 "--runs", str(args.runs), "--community-size", str(args.community_size)],
+                capture_output=True, text=True,
+            )
+            if child.returncode != 0:
+                print(f"\t{case} failed:\n{child.stderr}")
+                failed.append(f"{case} ({edges} edges)")
+                continue
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            result["edges"] = edges
+            results.append(result)
+            peak = f"{result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] is not None else "unknown"
+            print(f"\t{result['wall_seconds']:.3f}s wall, {result['cpu_seconds']:.3f}s cpu, {peak} peak RSS")
+
+    df = pd.DataFrame(results)
+    df.to_csv(args.output, mode="a", header=not os.path.exists(args.output), index=False)
+    print(f"Benchmark results appended to {args.output}")
+    if failed:
+        print(f"Failed cases: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
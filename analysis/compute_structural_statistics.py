@@ -2,59 +2,117 @@ import rustworkx as rwx
 import alive_progress, subprocess, os, sys
 import numpy as np
 import pandas as pd
+from collections import Counter
+from itertools import chain
+
+import profiling
+import run_ledger
+from streaming_statistics import accumulate, degree_statistics, streaming_structural_stats
+
+
+def edge_arrays(graph):
+    """
+    Edges of a rustworkx graph as arrays of node indices and weights (float, so that the
+    time-decayed weights of the backbones are kept).
+    :return: (sources, targets, weights)
+    """
+    n_edges = graph.num_edges()
+    # flattened without building a list of tuples
+    edges = np.fromiter(chain.from_iterable(graph.edge_list()), dtype=np.int32, count=2 * n_edges).reshape(-1, 2)
+    weights = np.fromiter((w["weight"] if isinstance(w, dict) else w for w in graph.edges()), dtype=np.float64,
+                          count=n_edges)
+    return edges[:, 0], edges[:, 1], weights
+
+
+def degree_arrays(graph):
+    """
+    Degree, strength and connected component of every node of a rustworkx graph, indexed by node index.
+    The edge arrays are already in memory, so they are accumulated as a single chunk: chunking only
+    bounds memory in streaming mode, and every chunk costs a pass over the nodes.
+    :return: (degree, strength, component label per node, component sizes, number of edges)
+    """
+    sources, targets, weights = edge_arrays(graph)
+    n_nodes = max(graph.node_indices(), default=-1) + 1
+    with profiling.profile("degree_arrays"):
+        degree, strength, labels, sizes = accumulate(n_nodes, [(sources, targets, weights)])
+    return degree, strength, labels, sizes, len(sources)
 
 
 def compute_structural_stats(graph, graph_name):
     """
     Compute structural statistics of a graph.
-    :param graph: NetworkX graph
+    :param graph: rustworkx graph
     :return: Dictionary of structural statistics
     """
+    degree, strength, labels, sizes, n_edges = degree_arrays(graph)
+    nodes = np.asarray(graph.node_indices(), dtype=np.int64)
+    return degree_statistics(graph_name, degree[nodes], strength[nodes], n_edges,
+                             len(np.unique(labels[nodes])), rwx.transitivity(graph))
 
-    # degree distribution
-    degree_sequence = sorted([graph.degree(n) for n in graph.node_indices()], reverse=True)  # degree sequence
-    min_degree = min(degree_sequence)
-    max_degree = max(degree_sequence)
-    mean_degree = np.mean(degree_sequence)
-    median_degree = np.median(degree_sequence)
-    degree_std = np.std(degree_sequence)
-
-    #weighted degree distribution
-    weighted_degree_sequence = sorted([sum([v if type(v) is int else v["weight"] for(k,v) in graph.adj(n).items()]) for n in graph.node_indices()], reverse=True)
-    w_min_degree = min(weighted_degree_sequence)
-    w_max_degree = max(weighted_degree_sequence)
-    w_mean_degree = np.mean(weighted_degree_sequence)
-    w_median_degree = np.median(weighted_degree_sequence)
-    w_degree_std = np.std(weighted_degree_sequence)
-    
-    try:
-        density = len(graph.edges()) / (len(graph.nodes()) * (len(graph.nodes()) - 1) / 2)
-    except:
-        density = -1
-
-
-    stats = {
-        'graph_name': graph_name,
-        'number_of_nodes': len(graph.nodes()),
-        'number_of_edges': len(graph.edges()),
-        'min_degree': min_degree,
-        'max_degree': max_degree,
-        'mean_degree': mean_degree,
-        'median_degree': median_degree,
-        'degree_std': degree_std,
-        'w_min_degree': w_min_degree,
-        'w_max_degree': w_max_degree,
-        'w_mean_degree': w_mean_degree,
-        'w_median_degree': w_median_degree,
-        'w_degree_std': w_degree_std,
-        'density': density ,
-        'transitivity': rwx.transitivity(graph),
-        'n_connected_components': rwx.number_connected_components(graph)
-    }
-
-    return stats
-
-def run(graph_input_directory, output_stats_file, output_stats_file_largest_cc, is_bacbone=False):
+def load_weighted_graph(graph_path, is_bacbone=False):
+    """
+    Load a weighted edge list (author1,author2,weight[,...]) as a rustworkx graph.
+    :param graph_path: path of the CSV edge list
+    :param is_bacbone: whether the file has a header line (backbones do)
+    :return: rustworkx PyGraph with author ids as node payloads and float weights (collaboration
+             counts, or time-decayed weights for the backbones of 03_backbone.py)
+    """
+    node_map = {}
+    graph = rwx.PyGraph()
+
+    num_lines = int(subprocess.run("wc -l " + graph_path, shell=True, text=True, capture_output=True).stdout.split(' ')[0])
+
+    with alive_progress.alive_bar(num_lines) as bar:
+        with open(graph_path, 'r') as f:
+
+            if is_bacbone:
+                next(f)
+
+            for data in f:
+                bar()
+                parts   = data.strip().split(",")
+                author1 = parts[0]
+                author2 = parts[1]
+                weight  = parts[2]
+
+                # add the nodes to the graph
+                if author1 not in node_map:
+                    node_map[author1] = graph.add_node(author1)
+                if author2 not in node_map:
+                    node_map[author2] = graph.add_node(author2)
+
+                # add the edge to the graph
+                graph.add_edge(node_map[author1], node_map[author2], float(weight))
+
+    return graph
+
+
+def eval_ccdf(graph):
+    degree_sequence = sorted(
+        (d for _, d in graph.degree()),
+        reverse=True
+    )
+    degreeCount = Counter(degree_sequence)
+    deg, cnt = zip(*degreeCount.items())
+    cs = np.cumsum(cnt)
+    return np.array(deg), np.array(cs)
+
+
+def append_stats(stats, output_path):
+    # dump the dict stats to a csv file, with the header only if the file does not exist yet
+    df = pd.DataFrame.from_dict(stats, orient='index').T
+    df.to_csv(output_path, mode='a', header=not os.path.exists(output_path), index=False)
+
+
+def run(graph_input_directory, output_stats_file, output_stats_file_largest_cc, is_bacbone=False,
+        streaming=False, chunk_size=5_000_000, work_directory=None):
+    """
+    Compute the structural statistics of every graph of a directory and of its largest connected component.
+    :param streaming: compute the statistics out of core (see streaming_statistics.py), without
+                      loading the graphs in memory and without transitivity
+    :param chunk_size: edges read at a time in streaming mode
+    :param work_directory: directory of the disk-backed edge arrays in streaming mode
+    """
     
     for path in os.listdir(graph_input_directory):
         if not path.endswith(".csv"):
@@ -64,67 +122,34 @@ def run(graph_input_directory, output_stats_file, output_stats_file_largest_cc,
         graph_name = path.split("/")[-1].split(".")[0]
         graph_path = f"{graph_input_directory}/{path}"
         
-        print(f"Loading graph {graph_name} from {graph_path}")
-        # load the graph
-        node_map = {}
-        graph = rwx.PyGraph()
-        
-        num_lines = int(subprocess.run("wc -l " + graph_path, shell=True, text=True, capture_output=True).stdout.split(' ')[0])
-        
-        with alive_progress.alive_bar(num_lines) as bar:
-            with open(graph_path, 'r') as f:
-                
-                if is_bacbone:
-                    next(f)
-           
-                
-                for data in f:
-                    bar()
-                    parts   = data.strip().split(",")
-                    author1 = parts[0]
-                    author2 = parts[1]
-                    weight  = parts[2]
-            
-                    # add the nodes to the graph
-                    if author1 not in node_map:
-                        node_map[author1] = graph.add_node(author1)
-                    if author2 not in node_map:
-                        node_map[author2] = graph.add_node(author2)
-                        
-                    # add the edge to the graph
-                    graph.add_edge(node_map[author1], node_map[author2], int(weight))
-                
-
-        print(f"Graph {graph_name} loaded with {len(graph.nodes())} nodes and {len(graph.edges())} edges")
-        
-        print(f"Computing statistics for graph {graph_name}")
-        # # compute the structural statistics
-        stats = compute_structural_stats(graph, graph_name)
+        with run_ledger.measure(graph_name, graph_path) as record:
+            if streaming:
+                print(f"Computing streaming statistics for graph {graph_name} from {graph_path}")
+                stats, largest_cc_stats, record["edges"] = streaming_structural_stats(
+                    graph_path, graph_name, is_bacbone, chunk_size, work_directory
+                )
+                append_stats(stats, output_stats_file)
+                append_stats(largest_cc_stats, output_stats_file_largest_cc)
+                continue
+
+            print(f"Loading graph {graph_name} from {graph_path}")
+            graph = load_weighted_graph(graph_path, is_bacbone)
+            record["edges"] = graph.num_edges()
+
+            print(f"Graph {graph_name} loaded with {len(graph.nodes())} nodes and {len(graph.edges())} edges")
         
-        # # dump the dict stats to a csv file
-        df = pd.DataFrame.from_dict(stats, orient='index').T
-
-        # # if output_path does not exist
-        if not os.path.exists(output_stats_file):
-            df.to_csv(output_stats_file, index=False)
-        else:
-            # append the new stats to the existing csv file
-            df.to_csv(output_stats_file, mode='a', header=False, index=False)
+            print(f"Computing statistics for graph {graph_name}")
+            # node indices of a freshly loaded graph are 0..n-1
+            degree, strength, labels, sizes, n_edges = degree_arrays(graph)
+            stats = degree_statistics(graph_name, degree, strength, n_edges, len(sizes), rwx.transitivity(graph))
+            append_stats(stats, output_stats_file)
             
-        print(f"Computing statistics for the largest connected component of graph {graph_name}")
-        # get the largest connected component
-        largest_cc = list(max(rwx.connected_components(graph), key=len))
-        graph = graph.subgraph(largest_cc)
-        
-        
-        # compute the structural statistics
-        stats = compute_structural_stats(graph, graph_name)
-        
-        # dump the dict stats to a csv file
-        df = pd.DataFrame.from_dict(stats, orient='index').T
-        
-        if not os.path.exists(output_stats_file_largest_cc):
-            df.to_csv(output_stats_file_largest_cc, index=False)
-        else:
-            # append the new stats to the existing csv file
-            df.to_csv(output_stats_file_largest_cc, mode='a', header=False, index=False)
+            print(f"Computing statistics for the largest connected component of graph {graph_name}")
+            # the largest connected component is selected by masking the degree arrays; every edge of
+            # the component has both ends in it, so its edges are half of its degrees. Transitivity is
+            # computed after removing the other components in place, instead of copying a subgraph.
+            largest = labels == np.argmax(sizes)
+            graph.remove_nodes_from(np.flatnonzero(~largest).tolist())
+            stats = degree_statistics(graph_name, degree[largest], strength[largest],
+                                      int(degree[largest].sum()) // 2, 1, rwx.transitivity(graph))
+            append_stats(stats, output_stats_file_largest_cc)
@@ -0,0 +1,53 @@
+"""
+Consensus partition of several Louvain runs of the same graph.
+
+The co-association of two adjacent nodes is the fraction of runs that put them in the same
+community. It is only evaluated on the edges of the graph, in O(runs x edges), never as a
+dense nodes x nodes matrix. Edges whose co-association reaches the threshold form the
+consensus graph, weighted by co-association, which is clustered with the csr Louvain.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+import louvain
+
+
+def run_labels(names: np.ndarray, partitions: list) -> np.ndarray:
+    """
+    :param names: node names indexed by node
+    :param partitions: runs, each a list of sets of node names
+    :return: runs x nodes int32 label matrix (-1 for nodes missing from a run)
+    """
+    index = {name: i for i, name in enumerate(names)}
+    labels = np.full((len(partitions), len(names)), -1, dtype=np.int32)
+    for run, partition in enumerate(partitions):
+        for label, community in enumerate(partition):
+            labels[run, [index[name] for name in community]] = label
+    return labels
+
+
+def co_association(adjacency: sp.csr_matrix, labels: np.ndarray):
+    """
+    Co-association of the endpoints of every edge (self-loops excluded).
+    :param labels: runs x nodes label matrix
+    :return: (edge sources, edge targets, fraction of runs in which they share a community)
+    """
+    edges = sp.triu(adjacency, k=1).tocoo()
+    together = np.zeros(edges.nnz, dtype=np.int32)
+    for run_labels in labels:
+        together += (run_labels[edges.row] == run_labels[edges.col]) & (run_labels[edges.row] >= 0)
+    return edges.row, edges.col, together / len(labels)
+
+
+def consensus_partition(adjacency: sp.csr_matrix, labels: np.ndarray, threshold: float = 0.5, seed: int = 42) -> np.ndarray:
+    """
+    :param labels: runs x nodes label matrix
+    :param threshold: minimum co-association of the edges kept in the consensus graph
+    :return: consensus label of every node
+    """
+    sources, targets, fraction = co_association(adjacency, labels)
+    kept = fraction >= threshold
+    consensus_graph = louvain.csr_from_edges(sources[kept], targets[kept], fraction[kept], adjacency.shape[0])
+    levels, _ = louvain.louvain_levels(consensus_graph, seed=seed)
+    return levels[-1] if levels else np.arange(adjacency.shape[0])
@@ -0,0 +1,116 @@
+"""
+Cumulative "as of year" collaboration graphs over the temporal edge store.
+
+The pair counts of every year are computed once, as sorted arrays of unique author-pair keys
+(pair_index.pack_pairs over the sorted author ids of the store). The pairs that are new in a
+year, which add edges and degrees, are found for all years at once with one np.unique over
+the concatenated yearly keys, instead of keeping the cumulative key array sorted year by year.
+Years are then walked in order, updating degrees, strengths, the number of edges and the
+connected components (union-find, as the graph only grows) with the new year only.
+
+The cumulative pair counts themselves are only kept when the snapshots are written: every
+year is then merged in with a sorted merge (searchsorted and insert), which rewrites the
+cumulative arrays, as the snapshot file written for the year does anyway.
+"""
+
+import os
+
+import numpy as np
+
+from streaming_statistics import degree_statistics
+from temporal_edges import TemporalEdgeStore, unpack_authors, write_weighted
+from union_find import UnionFind
+
+
+def merge_pair_counts(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray, new_counts: np.ndarray):
+    """
+    Sorted merge of two sorted unique key arrays with their counts.
+    :return: (merged keys, merged counts, mask of the new keys that were not in keys)
+    """
+    positions = np.searchsorted(keys, new_keys)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == new_keys[found]
+    counts = counts.copy()
+    counts[positions[found]] += new_counts[found]
+    added = ~found
+    return (np.insert(keys, positions[added], new_keys[added]),
+            np.insert(counts, positions[added], new_counts[added]), added)
+
+
+def first_seen(year_keys: list) -> list:
+    """
+    Mask of the keys of every year that are not in an earlier year, from one np.unique over the
+    keys of all the years (the first occurrence of a key is in the earliest year that has it).
+    :param year_keys: sorted unique keys of every year, in chronological order
+    """
+    if not year_keys:
+        return []
+    _, first = np.unique(np.concatenate(year_keys), return_index=True)
+    new = np.zeros(sum(len(keys) for keys in year_keys), dtype=bool)
+    new[first] = True
+    return np.split(new, np.cumsum([len(keys) for keys in year_keys])[:-1])
+
+
+class CumulativeGraph:
+
+    def __init__(self, n_authors: int):
+        self.n_edges = 0
+        self.degree = np.zeros(n_authors, dtype=np.int64)
+        self.strength = np.zeros(n_authors, dtype=np.int64)
+        self.components = UnionFind(n_authors)
+
+    def add(self, keys: np.ndarray, counts: np.ndarray, added: np.ndarray):
+        """
+        Add the pair counts of a year (sorted unique keys).
+        :param added: mask of the keys that are not in the graph yet (see first_seen)
+        """
+        n = len(self.degree)
+        self.n_edges += int(np.count_nonzero(added))
+        first = (keys >> np.uint64(32)).astype(np.int64)
+        second = (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+        # self-loops count twice in the degree and once in the strength, as in rustworkx
+        loops = first == second
+        self.degree += np.bincount(first[added], minlength=n) + np.bincount(second[added], minlength=n)
+        self.strength += (np.bincount(first, weights=counts, minlength=n)
+                          + np.bincount(second[~loops], weights=counts[~loops], minlength=n)).astype(np.int64)
+        self.components.union(first[~loops], second[~loops])
+
+    def statistics(self, graph_name: str):
+        """:return: (statistics of the graph, statistics of its largest connected component)"""
+        nodes = self.degree > 0
+        labels, _ = self.components.components()
+        _, labels, sizes = np.unique(labels[nodes], return_inverse=True, return_counts=True)
+        degree, strength = self.degree[nodes], self.strength[nodes]
+        stats = degree_statistics(graph_name, degree, strength, self.n_edges, len(sizes))
+
+        # every edge of the largest component has both ends in it, so its edges are half of its degrees
+        largest = labels == np.argmax(sizes) if len(sizes) else np.zeros(0, dtype=bool)
+        largest_cc_stats = degree_statistics(graph_name, degree[largest], strength[largest],
+                                             int(degree[largest].sum()) // 2, 1)
+        return stats, largest_cc_stats
+
+
+def cumulative_structural_stats(store: TemporalEdgeStore, snapshot_directory: str = None, chunk_size: int = 5_000_000):
+    """
+    Statistics of the cumulative graph as of every year of the store.
+    :param snapshot_directory: if given, the weighted edge list of every snapshot is also written
+                               there, named weighted__{year}_dataset.csv as the C++ "-{year}" interval
+    :return: generator of (year, statistics, largest connected component statistics), graphs
+             being named weighted__{year}_dataset
+    """
+    authors = store.authors(chunk_size=chunk_size)
+    years = store.years.tolist()
+    year_pairs = [store.pair_counts(authors, year, year, chunk_size) for year in years]
+    graph = CumulativeGraph(len(authors))
+    if snapshot_directory:
+        os.makedirs(snapshot_directory, exist_ok=True)
+        keys, counts = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+    for year, (year_keys, year_counts), added in zip(years, year_pairs, first_seen([k for k, _ in year_pairs])):
+        graph.add(year_keys, year_counts, added)
+        graph_name = f"weighted__{year}_dataset"
+        if snapshot_directory:
+            keys, counts, _ = merge_pair_counts(keys, counts, year_keys, year_counts)
+            write_weighted(os.path.join(snapshot_directory, f"{graph_name}.csv"), *unpack_authors(authors, keys), counts)
+        yield (year,) + graph.statistics(graph_name)
@@ -0,0 +1,381 @@
+"""
+Louvain community detection on CSR adjacency arrays, an alternative to
+nx.community.louvain_communities for large backbones.
+
+The graph is a symmetric scipy CSR matrix whose diagonal holds twice the self-loop weight,
+so that row sums are the weighted degrees as in networkx. The local moving phase is
+vectorised: every sweep visits the nodes in a seeded random order, split into batches whose
+nodes all pick their best community at once against the community totals of the previous
+batch. A singleton only joins another singleton with a lower label, which prevents
+two nodes from swapping communities in the same batch. Between levels communities are
+aggregated into the nodes of the next level by relabelling the CSR entries.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from parallel import process_pool
+from union_find import connected_components
+
+
+def csr_from_edges(sources: np.ndarray, targets: np.ndarray, weights: np.ndarray, n_nodes: int) -> sp.csr_matrix:
+    """Symmetric CSR adjacency from undirected edges given as arrays of node indices."""
+    adjacency = sp.csr_matrix(
+        (np.concatenate([weights, weights]).astype(np.float64),
+         (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+        shape=(n_nodes, n_nodes),
+    )
+    adjacency.sum_duplicates()
+    return adjacency
+
+
+def load_csr_graph(path: str, has_header: bool = True):
+    """
+    Load a weighted edge list (source,target,weight[,...]) as a CSR adjacency.
+    Nodes are numbered in order of first appearance, as networkx inserts them.
+    :return: (node names indexed by node, CSR adjacency)
+    """
+    df = pd.read_csv(path, header=0 if has_header else None, usecols=[0, 1, 2], names=["source", "target", "weight"],
+                     dtype={"source": str, "target": str})
+    codes, names = pd.factorize(df[["source", "target"]].to_numpy().ravel())
+    codes = codes.reshape(-1, 2)
+    adjacency = csr_from_edges(codes[:, 0], codes[:, 1], df["weight"].to_numpy(dtype=np.float64), len(names))
+    print(f"\tGraph has: {len(names)} nodes and {len(df)} edges")
+    return np.asarray(names, dtype=object), adjacency
+
+
+def networkx_edges(graph, weight: str = "weight"):
+    """
+    Edge arrays of a networkx graph, every undirected edge once.
+    :return: (node names indexed by node, edge sources, edge targets, edge weights)
+    """
+    names = np.empty(graph.number_of_nodes(), dtype=object)
+    names[:] = list(graph.nodes())
+    index = {name: i for i, name in enumerate(names)}
+    n_edges = graph.number_of_edges()
+    sources = np.fromiter((index[u] for u, _ in graph.edges()), dtype=np.int64, count=n_edges)
+    targets = np.fromiter((index[v] for _, v in graph.edges()), dtype=np.int64, count=n_edges)
+    weights = np.fromiter((w for _, _, w in graph.edges(data=weight, default=1.0)), dtype=np.float64, count=n_edges)
+    return names, sources, targets, weights
+
+
+def csr_from_networkx(graph, weight: str = "weight"):
+    """
+    CSR adjacency of a networkx graph.
+    :return: (node names indexed by node, CSR adjacency)
+    """
+    names, sources, targets, weights = networkx_edges(graph, weight)
+    return names, csr_from_edges(sources, targets, weights, len(names))
+
+
+def edge_count(adjacency: sp.csr_matrix) -> int:
+    """Number of undirected edges, self-loops included."""
+    return int(adjacency.nnz + np.count_nonzero(adjacency.diagonal())) // 2
+
+
+def node_strength(adjacency: sp.csr_matrix) -> np.ndarray:
+    """Weighted degree of every node (self-loops counted twice)."""
+    return np.asarray(adjacency.sum(axis=1)).ravel()
+
+
+def modularity(adjacency: sp.csr_matrix, labels: np.ndarray, resolution: float = 1.0,
+               strength: np.ndarray = None) -> float:
+    """
+    Modularity of a partition given as a label per node, as nx.community.modularity.
+    :param strength: node_strength of the adjacency, when already computed
+    """
+    strength = node_strength(adjacency) if strength is None else strength
+    two_m = strength.sum()
+    if two_m == 0:
+        return 0.0
+    rows = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr))
+    internal = adjacency.data[labels[rows] == labels[adjacency.indices]].sum()
+    totals = np.bincount(labels, weights=strength)
+    return float(internal / two_m - resolution * np.sum(totals ** 2) / two_m ** 2)
+
+
+def partition_quality(n_nodes: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray,
+                      labels: np.ndarray, resolution: float = 1.0):
+    """
+    Weighted modularity, coverage and performance of a partition in one pass over the edges,
+    as nx.community.modularity and nx.community.partition_quality (coverage and performance
+    count edges, not weights, and self-loops are intra-community edges). The inter-community
+    non-edges of the performance follow from the community sizes: (n^2 - sum of sizes^2) / 2
+    pairs of nodes are in different communities.
+    :param sources: every undirected edge once, self-loops included
+    :param labels: community label of every node, in 0..k-1
+    :return: (modularity, coverage, performance)
+    """
+    n_edges = len(sources)
+    if n_edges == 0:
+        return 0.0, 0.0, 0.0
+    k = labels.max() + 1
+    source_labels, target_labels = labels[sources], labels[targets]
+    intra = source_labels == target_labels
+
+    # modularity: internal weight and volume of every community
+    internal = np.bincount(source_labels[intra], weights=weights[intra], minlength=k)
+    volume = np.bincount(source_labels, weights=weights, minlength=k) + np.bincount(target_labels, weights=weights, minlength=k)
+    m = weights.sum()
+    modularity = float(np.sum(internal / m - resolution * (volume / (2 * m)) ** 2)) if m else 0.0
+
+    intra_edges = int(np.count_nonzero(intra))
+    sizes = np.bincount(labels, minlength=k).astype(np.float64)
+    inter_pairs = (n_nodes ** 2 - np.sum(sizes ** 2)) / 2
+    total_pairs = n_nodes * (n_nodes - 1) // 2
+    coverage = intra_edges / n_edges
+    performance = (intra_edges + inter_pairs - (n_edges - intra_edges)) / total_pairs if total_pairs else 0.0
+    return modularity, coverage, float(performance)
+
+
+def _edge_ranges(indptr: np.ndarray, nodes: np.ndarray):
+    """Positions in the CSR arrays of the edges of the given nodes, and the batch row of each."""
+    starts, counts = indptr[nodes], indptr[nodes + 1] - indptr[nodes]
+    rows = np.repeat(np.arange(len(nodes)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    return positions, rows
+
+
+def _move_batch(adjacency, nodes, labels, strength, totals, sizes, two_m, resolution) -> int:
+    """Move every node of the batch to its best neighbouring community. :return: number of moves"""
+    n = adjacency.shape[0]
+    positions, rows = _edge_ranges(adjacency.indptr, nodes)
+    neighbours = adjacency.indices[positions]
+    keep = neighbours != nodes[rows]
+    rows, neighbours, weights = rows[keep], neighbours[keep], adjacency.data[positions[keep]]
+
+    own = labels[nodes]
+    k = strength[nodes]
+
+    # weight from every batch node to every neighbouring community
+    pairs, inverse = np.unique(rows.astype(np.int64) * n + labels[neighbours], return_inverse=True)
+    pair_weights = np.bincount(inverse, weights=weights)
+    pair_rows, pair_labels = pairs // n, pairs % n
+
+    is_own = pair_labels == own[pair_rows]
+    own_weights = np.zeros(len(nodes))
+    own_weights[pair_rows[is_own]] = pair_weights[is_own]
+    stay_gain = own_weights - resolution * k * (totals[own] - k) / two_m
+
+    gain = pair_weights - resolution * k[pair_rows] * totals[pair_labels] / two_m
+    gain[is_own] = -np.inf
+    gain[(sizes[own[pair_rows]] == 1) & (sizes[pair_labels] == 1) & (pair_labels > own[pair_rows])] = -np.inf
+    if not len(gain):
+        return 0
+
+    # best community of every row: highest gain, then lowest label
+    order = np.lexsort((pair_labels, -gain, pair_rows))
+    first = order[np.unique(pair_rows[order], return_index=True)[1]]
+    best_rows, best_labels, best_gain = pair_rows[first], pair_labels[first], gain[first]
+
+    move = best_gain > stay_gain[best_rows] + 1e-12
+    movers, targets = best_rows[move], best_labels[move]
+    if not len(movers):
+        return 0
+
+    moved_k, sources = k[movers], own[movers]
+    totals -= np.bincount(sources, weights=moved_k, minlength=n)
+    totals += np.bincount(targets, weights=moved_k, minlength=n)
+    sizes -= np.bincount(sources, minlength=n)
+    sizes += np.bincount(targets, minlength=n)
+    labels[nodes[movers]] = targets
+    return len(movers)
+
+
+def local_moving(adjacency: sp.csr_matrix, labels: np.ndarray, rng, resolution: float = 1.0,
+                 threshold: float = 1e-7, batches: int = 32, max_sweeps: int = 100, strength: np.ndarray = None):
+    """
+    Move nodes between communities until a sweep moves no node or improves modularity by
+    no more than threshold.
+    :param labels: initial community of every node, in 0..n-1 (modified in place)
+    :param strength: node_strength of the adjacency, when already computed
+    :return: (labels, number of sweeps, number of moved nodes)
+    """
+    n = adjacency.shape[0]
+    strength = node_strength(adjacency) if strength is None else strength
+    two_m = strength.sum()
+    totals = np.bincount(labels, weights=strength, minlength=n)
+    sizes = np.bincount(labels, minlength=n)
+    if two_m == 0:
+        return labels, 0, 0
+
+    current = modularity(adjacency, labels, resolution, strength)
+    moved, sweeps = 0, 0
+    while sweeps < max_sweeps:
+        sweeps += 1
+        sweep_moves = 0
+        for nodes in np.array_split(rng.permutation(n), min(batches, n)):
+            sweep_moves += _move_batch(adjacency, nodes, labels, strength, totals, sizes, two_m, resolution)
+        moved += sweep_moves
+        previous, current = current, modularity(adjacency, labels, resolution, strength)
+        if sweep_moves == 0 or current - previous <= threshold:
+            break
+    return labels, sweeps, moved
+
+
+def aggregate(adjacency: sp.csr_matrix, labels: np.ndarray) -> sp.csr_matrix:
+    """Graph of the communities: labels must be dense (0..k-1). Internal weights go to the diagonal."""
+    k = labels.max() + 1
+    coo = adjacency.tocoo()
+    aggregated = sp.csr_matrix((coo.data, (labels[coo.row], labels[coo.col])), shape=(k, k))
+    aggregated.sum_duplicates()
+    return aggregated
+
+
+def louvain_levels(adjacency: sp.csr_matrix, seed: int = 42, resolution: float = 1.0, threshold: float = 1e-7,
+                   batches: int = 32, initial_labels: np.ndarray = None, strength: np.ndarray = None):
+    """
+    Louvain method, following nx.community.louvain_partitions: a level is kept when its
+    local moving phase moved at least one node, and the method stops after a level that
+    improved modularity by no more than threshold.
+    :param initial_labels: warm start partition of the first level instead of singletons;
+                           it is kept as first level even if no node moves
+    :param strength: node_strength of the adjacency, shared by runs of the same graph
+    :return: (list of community labels of the original nodes, one array per level from the
+             finest to the coarsest, list of local moving sweeps per level)
+    """
+    rng = np.random.default_rng(seed)
+    node_labels = np.arange(adjacency.shape[0])
+    labels = node_labels.copy() if initial_labels is None else split_disconnected(adjacency, initial_labels)
+    levels, sweeps = [], []
+    strength = node_strength(adjacency) if strength is None else strength
+    current = modularity(adjacency, labels, resolution, strength)
+
+    while True:
+        labels, level_sweeps, moved = local_moving(adjacency, labels, rng, resolution, threshold, batches,
+                                                   strength=strength)
+        sweeps.append(level_sweeps)
+        if moved == 0 and (levels or initial_labels is None):
+            break
+
+        labels = np.unique(labels, return_inverse=True)[1]
+        node_labels = labels[node_labels]
+        levels.append(node_labels)
+
+        previous, current = current, modularity(adjacency, labels, resolution, strength)
+        if current - previous <= threshold:
+            break
+        adjacency = aggregate(adjacency, labels)
+        strength = np.bincount(labels, weights=strength)
+        labels = np.arange(adjacency.shape[0])
+
+    return levels, sweeps
+
+
+# ordered adjacency shared with the forked workers of louvain_by_component
+_component_blocks = {}
+
+
+def _louvain_block(task):
+    start, end, seed, resolution, threshold, batches = task
+    block = _component_blocks["adjacency"][start:end, start:end]
+    # the components keep the null model of the whole graph: the resolution is scaled to their weight
+    block_resolution = resolution * block.sum() / _component_blocks["two_m"]
+    levels, _ = louvain_levels(block, seed, block_resolution, threshold, batches)
+    return levels or [np.arange(end - start)]
+
+
+def louvain_by_component(adjacency: sp.csr_matrix, seed: int = 42, resolution: float = 1.0, threshold: float = 1e-7,
+                         batches: int = 32, workers: int = 0, chunk_nodes: int = 100_000):
+    """
+    Louvain run separately on the connected components of the graph. Cliques (isolated nodes and
+    pairs included) are one community each. The other components are grouped in chunks of about
+    chunk_nodes nodes clustered by worker processes, while the largest one is clustered in the
+    calling process.
+    :return: (community labels of every level, finest first, number of components, number of cliques).
+             Components with a shallower dendrogram keep their coarsest labels in the deeper levels.
+    """
+    n = adjacency.shape[0]
+    coo = adjacency.tocoo()
+    off_diagonal = coo.row != coo.col
+    sources, targets = coo.row[off_diagonal], coo.col[off_diagonal]
+    components, sizes = connected_components(n, sources, targets)
+    edges = np.bincount(components[sources], minlength=len(sizes)) // 2
+    cliques = edges == sizes * (sizes - 1) // 2
+
+    # nodes ordered by component: the cliques, then the other components, the largest last
+    rank = np.where(cliques, 0, 1)
+    if not cliques.all():
+        rank[np.argmax(np.where(cliques, 0, sizes))] = 2
+    order = np.lexsort((components, rank[components]))
+    bounds = np.flatnonzero(np.diff(components[order])) + 1
+    starts, ends = np.concatenate([[0], bounds]), np.concatenate([bounds, [n]])
+    block_rank = rank[components[order][starts]]
+
+    labels = np.empty(n, dtype=np.int64)
+    n_cliques = int(np.count_nonzero(block_rank == 0))
+    clique_end = ends[n_cliques - 1] if n_cliques else 0
+    labels[order[:clique_end]] = np.repeat(np.arange(n_cliques), (ends - starts)[:n_cliques])
+
+    # consecutive components are clustered together, they share no edge
+    blocks = []
+    for start, end in zip(starts[block_rank == 1], ends[block_rank == 1]):
+        if blocks and blocks[-1][1] - blocks[-1][0] < chunk_nodes:
+            blocks[-1][1] = end
+        else:
+            blocks.append([start, end])
+    tasks = [(start, end, seed + i + 1, resolution, threshold, batches) for i, (start, end) in enumerate(blocks)]
+    largest = [(starts[i], ends[i], seed, resolution, threshold, batches) for i in np.flatnonzero(block_rank == 2)]
+
+    _component_blocks.update(adjacency=adjacency[order][:, order].tocsr(), two_m=adjacency.sum())
+    try:
+        with process_pool(workers) as pool:
+            pending = pool.map_async(_louvain_block, tasks)
+            results = [_louvain_block(task) for task in largest]
+            results = pending.get() + results
+    finally:
+        _component_blocks.clear()
+
+    levels = [labels.copy() for _ in range(max((len(block_levels) for block_levels in results), default=1))]
+    for depth, level_labels in enumerate(levels):
+        next_label = n_cliques
+        for (start, end, *_), block_levels in zip(tasks + largest, results):
+            block_labels = block_levels[min(depth, len(block_levels) - 1)]
+            level_labels[order[start:end]] = next_label + block_labels
+            next_label += int(block_labels.max()) + 1
+    return levels, len(sizes), n_cliques
+
+
+def seed_labels(names: np.ndarray, previous_names: np.ndarray, previous_labels: np.ndarray) -> np.ndarray:
+    """
+    Warm start labels for a graph from the partition of another graph (e.g. the previous
+    interval): shared nodes keep their community, new nodes are singletons.
+    """
+    positions = pd.Index(previous_names).get_indexer(names)
+    shared = positions >= 0
+    labels = np.empty(len(names), dtype=np.int64)
+    labels[shared] = previous_labels[positions[shared]]
+    labels[~shared] = previous_labels.max(initial=-1) + 1 + np.arange(np.count_nonzero(~shared))
+    return labels
+
+
+def split_disconnected(adjacency: sp.csr_matrix, labels: np.ndarray) -> np.ndarray:
+    """Split every community into its connected parts in the graph, as dense labels."""
+    coo = adjacency.tocoo()
+    internal = labels[coo.row] == labels[coo.col]
+    return connected_components(adjacency.shape[0], coo.row[internal], coo.col[internal])[0]
+
+
+def labels_from_communities(names: np.ndarray, communities: list) -> np.ndarray:
+    """Community label of every node, the label being the position of its community in the list."""
+    index = {name: i for i, name in enumerate(names)}
+    labels = np.full(len(names), -1, dtype=np.int64)
+    for label, community in enumerate(communities):
+        labels[[index[name] for name in community]] = label
+    return labels
+
+
+def communities_from_labels(names: np.ndarray, labels: np.ndarray) -> list:
+    """Partition as a list of sets of node names, ordered by label."""
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [set(group.tolist()) for group in np.split(names[order], bounds)]
+
+
+def louvain_communities(names: np.ndarray, adjacency: sp.csr_matrix, seed: int = 42, resolution: float = 1.0,
+                        threshold: float = 1e-7, batches: int = 32) -> list:
+    """Final Louvain level as a list of sets of node names, like nx.community.louvain_communities."""
+    levels, _ = louvain_levels(adjacency, seed, resolution, threshold, batches)
+    labels = levels[-1] if levels else np.arange(adjacency.shape[0])
+    return communities_from_labels(names, labels)
@@ -0,0 +1,92 @@
+import os
+from collections import Counter
+
+from parallel import process_pool, worker_count
+
+
+def split_byte_ranges(path: str, chunks: int, skip_header: bool = True) -> list:
+    """
+    Split a file into newline-aligned byte ranges.
+    :param path: file to split
+    :param chunks: number of ranges to produce (fewer are returned for small files)
+    :param skip_header: whether the first line is excluded from the ranges
+    :return: list of (start, end) byte offsets, every range starting at a line start
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        first = len(f.readline()) if skip_header else 0
+        boundaries = [first]
+        step = max(1, (size - first) // chunks)
+        for i in range(1, chunks):
+            f.seek(max(first + i * step, boundaries[-1]))
+            f.readline()
+            offset = min(f.tell(), size)
+            if offset > boundaries[-1]:
+                boundaries.append(offset)
+        if boundaries[-1] < size:
+            boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def aggregate_range(task: tuple) -> tuple:
+    """
+    Aggregate the metadata lines of a byte range.
+    :param task: (path, start, end)
+    :return: (works per year, (year, number of authors) histogram, (year, raw topic) counts)
+    """
+    path, start, end = task
+    works_per_year = Counter()
+    authors_histogram = Counter()
+    topic_counts = Counter()
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            offset += len(line)
+
+            parts = line.decode("utf-8", "ignore").strip().split(",")
+            year = parts[1]
+            if not year.isdigit():
+                continue
+            year = int(year)
+
+            works_per_year[year] += 1
+            authors_histogram[(year, int(parts[2]))] += 1
+            for topic in parts[3].split(";"):
+                topic_counts[(year, topic)] += 1
+
+    return works_per_year, authors_histogram, topic_counts
+
+
+def aggregate_metadata(path: str, workers: int = 0) -> tuple:
+    """
+    Aggregate the metadata CSV in parallel over newline-aligned byte ranges.
+    Memory depends on the number of distinct (year, topic) pairs, not on the number of works.
+    :param path: metadata CSV (work_id,year,num_of_authors,topics)
+    :param workers: worker processes, 0 for all cores
+    :return: (works per year, (year, number of authors) histogram,
+              (year, raw topic id) counts, raw topic vocabulary)
+    """
+    # a few ranges per worker keep the cores busy when the lines are unevenly distributed
+    ranges = split_byte_ranges(path, 4 * worker_count(workers))
+
+    works_per_year = Counter()
+    authors_histogram = Counter()
+    topic_counts = Counter()
+
+    with process_pool(workers) as pool:
+        for works, authors, topics in pool.imap_unordered(aggregate_range, [(path, s, e) for s, e in ranges]):
+            works_per_year.update(works)
+            authors_histogram.update(authors)
+            topic_counts.update(topics)
+
+    raw_topic_ids = {}
+    pair_counts = {}
+    for (year, topic), count in topic_counts.items():
+        pair_counts[(year, raw_topic_ids.setdefault(topic, len(raw_topic_ids)))] = count
+
+    return works_per_year, authors_histogram, pair_counts, list(raw_topic_ids)
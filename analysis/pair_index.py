@@ -0,0 +1,90 @@
+"""
+Index of the works of every author pair of a collaboration edge list, as sorted arrays.
+
+Author ids (int64, beyond 32 bits) are replaced by their position in the sorted id array, and
+every unordered pair of distinct authors is packed into a uint64 key (smaller index in the
+high 32 bits). Keys are sorted and unique; the works of key i are works[offsets[i]:offsets[i + 1]],
+so pairs that collaborated on several works keep all of them. Lookups are vectorised with
+np.searchsorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def pack_pairs(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """uint64 keys of unordered pairs of dense author indices."""
+    first, second = first.astype(np.uint64), second.astype(np.uint64)
+    return (np.minimum(first, second) << np.uint64(32)) | np.maximum(first, second)
+
+
+class PairIndex:
+
+    def __init__(self, author1: np.ndarray, author2: np.ndarray, works: np.ndarray):
+        """
+        :param author1: int64 author ids of every edge
+        :param author2: int64 author ids of every edge
+        :param works: int64 work id of every edge; self-loops (single-author works) are not indexed
+        """
+        distinct = author1 != author2
+        author1, author2, works = author1[distinct], author2[distinct], works[distinct]
+        self.authors = np.unique(np.concatenate([author1, author2]))
+        keys = pack_pairs(np.searchsorted(self.authors, author1), np.searchsorted(self.authors, author2))
+        order = np.argsort(keys, kind="stable")
+        self.keys, starts = np.unique(keys[order], return_index=True)
+        self.offsets = np.append(starts, len(order)).astype(np.int64)
+        self.works = works[order]
+
+    def __len__(self) -> int:
+        """Number of author pairs."""
+        return len(self.keys)
+
+    def works_of(self, keys: np.ndarray) -> np.ndarray:
+        """Works of every indexed pair among the given keys (pairs without works are skipped)."""
+        positions = np.searchsorted(self.keys, keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == keys[found]
+        starts, ends = self.offsets[positions[found]], self.offsets[positions[found] + 1]
+        counts = ends - starts
+        return self.works[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+    def community_works(self, author_ids: np.ndarray, chunk_size: int = 1 << 22) -> np.ndarray:
+        """
+        Distinct works of the pairs of distinct authors of a community.
+        The pairs of small communities are looked up in chunks; when a community has more pairs
+        than the index, the index keys are scanned for pairs inside the community instead.
+        """
+        positions = np.searchsorted(self.authors, author_ids)
+        known = positions < len(self.authors)
+        known[known] = self.authors[positions[known]] == author_ids[known]
+        positions = np.unique(positions[known])
+        n = len(positions)
+        if n * (n - 1) // 2 > len(self.keys):
+            member = np.zeros(len(self.authors), dtype=bool)
+            member[positions] = True
+            inside = member[(self.keys >> np.uint64(32)).astype(np.int64)] & member[(self.keys & np.uint64(0xFFFFFFFF)).astype(np.int64)]
+            return np.unique(self.works_of(self.keys[inside]))
+
+        found = []
+        rows_per_chunk = max(1, chunk_size // max(n, 1))
+        for start in range(0, n, rows_per_chunk):
+            # pairs (i, j) with i < j, i in this chunk of rows
+            rows = np.arange(start, min(start + rows_per_chunk, n))
+            first = np.repeat(rows, n - rows - 1)
+            second = np.arange(len(first)) - np.repeat(np.cumsum(n - rows - 1) - (n - rows - 1), n - rows - 1) + first + 1
+            found.append(self.works_of(pack_pairs(positions[first], positions[second])))
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+
+def load_pair_index(path: str, skip_first_line: bool = False, chunk_size: int = 1_000_000) -> PairIndex:
+    """PairIndex of a 4-column edge list (year,work,author1,author2) with "W" / "A" prefixed ids."""
+    author1, author2, works = [], [], []
+    reader = pd.read_csv(path, header=None, usecols=[1, 2, 3], names=["work", "author1", "author2"], dtype=str,
+                         skiprows=1 if skip_first_line else 0, chunksize=chunk_size)
+    for chunk in reader:
+        works.append(chunk["work"].str.lstrip("W").to_numpy(dtype=np.int64))
+        author1.append(chunk["author1"].str.lstrip("A").to_numpy(dtype=np.int64))
+        author2.append(chunk["author2"].str.lstrip("A").to_numpy(dtype=np.int64))
+    if not works:
+        return PairIndex(*(np.empty(0, dtype=np.int64) for _ in range(3)))
+    return PairIndex(np.concatenate(author1), np.concatenate(author2), np.concatenate(works))
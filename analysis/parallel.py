@@ -0,0 +1,16 @@
+import multiprocessing
+import os
+
+
+def worker_count(workers: int = 0) -> int:
+    """Number of worker processes to use; 0 or a negative value means all cores."""
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+
+def process_pool(workers: int = 0):
+    """
+    Process pool for the analysis steps.
+    The steps are plain top-level scripts, so workers are forked: a spawned worker would
+    re-import the calling script and run the whole step again.
+    """
+    return multiprocessing.get_context("fork").Pool(worker_count(workers))
@@ -0,0 +1,125 @@
+"""
+Community partitions stored as .npz files, one file per interval:
+  - "authors": sorted OpenAlex author ids of the graph, as int64 without the "A" prefix
+  - "run_<i>": int32 community label of every author in run i (one column per run)
+  - "consensus": optional int32 consensus labels of the runs (see consensus.py)
+  - "level_<k>": optional int32 labels of the Louvain dendrogram of run 0, from the finest
+    level (k = 0) to the coarsest, which is the partition of the run itself
+
+The members of an .npz are read lazily, so a single run is loaded without the others.
+Running this file converts legacy pickles (list of sets, or list of runs for the stability
+step) to the .npz format next to them:
+  partition_store.py <communities.pkl> [<communities.pkl> ...]
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+
+PARTITION_EXTENSION = ".npz"
+LEVEL_PREFIX = "level_"
+
+
+def author_ids(names) -> np.ndarray:
+    """OpenAlex author names ("A123") as int64 ids."""
+    return np.array([int(str(name).lstrip("A")) for name in names], dtype=np.int64)
+
+
+def author_names(ids: np.ndarray) -> list:
+    return [f"A{author}" for author in ids.tolist()]
+
+
+def labels_from_communities(authors: np.ndarray, communities: list) -> np.ndarray:
+    """
+    Label of every author of a sorted id array, the label being the position of its community
+    in the list. Authors missing from every community get -1.
+    """
+    labels = np.full(len(authors), -1, dtype=np.int32)
+    for label, community in enumerate(communities):
+        labels[np.searchsorted(authors, author_ids(community))] = label
+    return labels
+
+
+def save_labels(path: str, authors: np.ndarray, runs: list, consensus: np.ndarray = None, levels: list = None):
+    """
+    :param authors: sorted int64 author ids
+    :param runs: label array of every run, aligned with authors
+    :param consensus: consensus label array, aligned with authors
+    :param levels: label array of every dendrogram level of run 0, finest first, aligned with authors
+    """
+    columns = {f"run_{i}": np.asarray(labels, dtype=np.int32) for i, labels in enumerate(runs)}
+    if consensus is not None:
+        columns["consensus"] = np.asarray(consensus, dtype=np.int32)
+    for i, labels in enumerate(levels or []):
+        columns[f"{LEVEL_PREFIX}{i}"] = np.asarray(labels, dtype=np.int32)
+    np.savez_compressed(path, authors=np.asarray(authors, dtype=np.int64), **columns)
+
+
+def save_partitions(path: str, runs: list, consensus: list = None, levels: list = None):
+    """
+    Store one or more partitions of the same graph.
+    :param runs: list of partitions, each a list of sets of author names
+    :param consensus: consensus partition of the runs, as a list of sets of author names
+    :param levels: dendrogram levels of the first run, finest first, each a list of sets of author names
+    """
+    authors = np.unique(np.concatenate([author_ids(set().union(*partition)) for partition in runs]))
+    save_labels(path, authors, [labels_from_communities(authors, partition) for partition in runs],
+                labels_from_communities(authors, consensus) if consensus is not None else None,
+                [labels_from_communities(authors, partition) for partition in levels or []])
+    print("\tCommunities dumped to: ", path)
+
+
+def run_count(path: str) -> int:
+    with np.load(path) as f:
+        return sum(1 for name in f.files if name.startswith("run_"))
+
+
+def is_level(run) -> bool:
+    return isinstance(run, str) and run.startswith(LEVEL_PREFIX)
+
+
+def load_labels(path: str, run=0):
+    """
+    :param run: run index, or the name of a label column ("run_<i>", "consensus" or "level_<k>").
+                Negative levels count from the coarsest one ("level_-1"), and levels beyond the
+                depth of the dendrogram give its coarsest level.
+    :return: (sorted int64 author ids, int32 labels of the run)
+    """
+    with np.load(path) as f:
+        if is_level(run):
+            n_levels = sum(1 for name in f.files if name.startswith(LEVEL_PREFIX))
+            if not n_levels:
+                raise KeyError(f"{path} has no dendrogram levels")
+            level = int(run[len(LEVEL_PREFIX):])
+            run = f"{LEVEL_PREFIX}{min(level if level >= 0 else max(n_levels + level, 0), n_levels - 1)}"
+        return f["authors"], f[run if isinstance(run, str) else f"run_{run}"]
+
+
+def load_partition(path: str, run=0) -> list:
+    """A stored run (see load_labels) as a list of sets of author names, ordered by label."""
+    authors, labels = load_labels(path, run)
+    kept = labels >= 0
+    authors, labels = authors[kept], labels[kept]
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [set(author_names(group)) for group in np.split(authors[order], bounds)] if len(order) else []
+
+
+def convert_pickle(pickle_path: str) -> str:
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    # the stability step stores a list of runs, the extraction step a single partition
+    runs = data if data and isinstance(data[0], list) else [data]
+    output_path = os.path.splitext(pickle_path)[0] + PARTITION_EXTENSION
+    save_partitions(output_path, runs)
+    return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <communities.pkl> [<communities.pkl> ...]")
+        sys.exit(1)
+    for pickle_path in sys.argv[1:]:
+        convert_pickle(pickle_path)
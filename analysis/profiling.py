@@ -0,0 +1,157 @@
+"""
+Profiling hooks selectable per step and per graph from the [profiling] TOML section.
+
+- "sampling": a background thread samples the stack of the profiled thread at a fixed
+  interval and writes collapsed stacks ("frame;frame;frame count"), the input format of
+  flamegraph.pl and speedscope.
+- "tracemalloc": Python allocations are traced and the top allocation sites (by line and
+  by traceback) are written to a text report.
+
+Profiled regions are the run ledger units (see run_ledger.measure), the whole step, or the
+named regions opened with profile() inside the steps.
+"""
+
+import atexit
+import datetime
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+_profiling = {"mode": "none", "step": None, "units": [], "output": None, "run_id": None,
+              "interval": 0.005, "top_allocators": 25, "active": False, "seen": Counter()}
+
+
+def configure(configuration: dict, step: str):
+    """
+    Enable profiling for this step if selected by the configuration. With an empty list of
+    units the whole step is profiled, otherwise only the listed units ("*" for every unit).
+    """
+    settings = configuration.get("profiling", {})
+    mode = settings.get("mode", "none")
+    steps = settings.get("steps", [])
+    if mode == "none" or (steps and step not in steps):
+        return
+    if mode not in ("sampling", "tracemalloc"):
+        print(f"Unknown profiling mode {mode}, profiling disabled")
+        return
+
+    _profiling.update(
+        mode=mode,
+        step=step,
+        units=settings.get("units", []),
+        output=os.path.join(configuration["statistics_out_basedir"], settings.get("output_directory", "profiles")),
+        run_id=f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        interval=settings.get("interval", 0.005),
+        top_allocators=settings.get("top_allocators", 25),
+    )
+    os.makedirs(_profiling["output"], exist_ok=True)
+    print(f"Profiling ({mode}) enabled for {step}, output in {_profiling['output']}")
+
+    if not _profiling["units"]:
+        session = _start("step")
+        atexit.register(_stop, session)
+
+
+def _selected(unit: str) -> bool:
+    units = _profiling["units"]
+    return _profiling["mode"] != "none" and not _profiling["active"] and ("*" in units or unit in units)
+
+
+def _output_path(unit: str, extension: str) -> str:
+    unit = unit.replace("/", "_").replace(" ", "_")
+    # a region entered several times (e.g. once per graph) gets one profile per entry
+    _profiling["seen"][unit] += 1
+    if _profiling["seen"][unit] > 1:
+        unit = f"{unit}-{_profiling['seen'][unit]}"
+    return os.path.join(_profiling["output"], f"{_profiling['step']}.{unit}.{_profiling['run_id']}.{extension}")
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of a thread every interval seconds and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+
+def _start(unit: str) -> dict:
+    _profiling["active"] = True
+    session = {"unit": unit, "started": time.perf_counter()}
+    if _profiling["mode"] == "sampling":
+        session["sampler"] = StackSampler(threading.get_ident(), _profiling["interval"])
+        session["sampler"].start()
+    else:
+        tracemalloc.start(25)
+    return session
+
+
+def _stop(session: dict):
+    unit = session["unit"]
+    elapsed = time.perf_counter() - session["started"]
+
+    if _profiling["mode"] == "sampling":
+        stacks = session["sampler"].stop()
+        path = _output_path(unit, "collapsed")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    else:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        path = _output_path(unit, "tracemalloc.txt")
+        top = _profiling["top_allocators"]
+        with open(path, "w") as f:
+            f.write(f"{_profiling['step']} / {unit}: {elapsed:.2f}s, "
+                    f"traced current {current / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB\n")
+            f.write(f"\nTop {top} allocation sites by line\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTop {top} allocation tracebacks\n")
+            for stat in snapshot.statistics("traceback")[:top]:
+                f.write(f"\n{stat.size / 2 ** 20:.1f} MB in {stat.count} blocks\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+
+    _profiling["active"] = False
+    print(f"Profile of {unit} saved to {path}")
+
+
+@contextmanager
+def profile(unit: str):
+    """Profile a region if it is selected by the configuration, otherwise do nothing."""
+    if not _selected(unit):
+        yield
+        return
+
+    session = _start(unit)
+    try:
+        yield
+    finally:
+        _stop(session)
@@ -0,0 +1,95 @@
+"""
+Structural statistics of sliding windows of years over the temporal edge store.
+
+The weighted graph of a window is kept as the multiplicity of every author pair of the whole
+store (a sorted pair-key universe). Stepping the window adds the pair counts of the entering
+years and subtracts those of the leaving years; degrees, strengths and the number of edges
+only change for the pairs whose multiplicity crosses zero, so every step costs the edges of
+the years entering and leaving the window. Connected components cannot be maintained under
+edge deletions by a union-find, so they are rebuilt for every window from the pairs present
+in it. Transitivity is not computed and is reported as NaN, as in streaming mode.
+"""
+
+import numpy as np
+
+from streaming_statistics import degree_statistics
+from temporal_edges import TemporalEdgeStore
+from union_find import connected_components
+
+
+class RollingGraph:
+
+    def __init__(self, store: TemporalEdgeStore, chunk_size: int = 5_000_000):
+        self.authors = store.authors(chunk_size=chunk_size)
+        self.year_pairs = {int(year): store.pair_counts(self.authors, year, year, chunk_size) for year in store.years}
+        self.keys = np.unique(np.concatenate([keys for keys, _ in self.year_pairs.values()])) \
+            if self.year_pairs else np.empty(0, dtype=np.uint64)
+        self.first = (self.keys >> np.uint64(32)).astype(np.int64)
+        self.second = (self.keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        self.loops = self.first == self.second
+
+        n = len(self.authors)
+        self.multiplicity = np.zeros(len(self.keys), dtype=np.int64)
+        self.degree = np.zeros(n, dtype=np.int64)
+        self.strength = np.zeros(n, dtype=np.int64)
+        self.n_edges = 0
+
+    def update(self, year: int, sign: int):
+        """Add (sign = 1) or subtract (sign = -1) the collaborations of a year."""
+        if year not in self.year_pairs:
+            return
+        n = len(self.authors)
+        keys, counts = self.year_pairs[year]
+        positions = np.searchsorted(self.keys, keys)
+        before = self.multiplicity[positions] > 0
+        self.multiplicity[positions] += sign * counts
+        changed = positions[before != (self.multiplicity[positions] > 0)]
+
+        # self-loops count twice in the degree and once in the strength, as in rustworkx
+        self.degree += sign * (np.bincount(self.first[changed], minlength=n) + np.bincount(self.second[changed], minlength=n))
+        self.n_edges += sign * len(changed)
+        loops = self.loops[positions]
+        self.strength += sign * (np.bincount(self.first[positions], weights=counts, minlength=n)
+                                 + np.bincount(self.second[positions[~loops]], weights=counts[~loops], minlength=n)).astype(np.int64)
+
+    def statistics(self, graph_name: str):
+        """:return: (statistics of the window graph, statistics of its largest connected component)"""
+        nodes = self.degree > 0
+        present = self.multiplicity > 0
+        labels, _ = connected_components(len(self.authors), self.first[present], self.second[present])
+        _, labels, sizes = np.unique(labels[nodes], return_inverse=True, return_counts=True)
+        degree, strength = self.degree[nodes], self.strength[nodes]
+        stats = degree_statistics(graph_name, degree, strength, self.n_edges, len(sizes))
+
+        # every edge of the largest component has both ends in it, so its edges are half of its degrees
+        largest = labels == np.argmax(sizes) if len(sizes) else np.zeros(0, dtype=bool)
+        largest_cc_stats = degree_statistics(graph_name, degree[largest], strength[largest],
+                                             int(degree[largest].sum()) // 2, 1)
+        return stats, largest_cc_stats
+
+
+def window_starts(first_year: int, last_year: int, window: int, step: int = 1) -> list:
+    """First year of every window of `window` years, stepping by `step`, within [first_year, last_year]."""
+    return list(range(first_year, max(last_year - window + 2, first_year + 1), step))
+
+
+def rolling_structural_stats(store: TemporalEdgeStore, window: int, step: int = 1, chunk_size: int = 5_000_000):
+    """
+    Statistics of every window of `window` years, stepping by `step` years, over the years of the store.
+    :return: generator of (start year, end year, statistics, largest connected component statistics),
+             graphs being named weighted_{start}_{end}_dataset as the interval files
+    """
+    if not len(store.years):
+        return
+    graph = RollingGraph(store, chunk_size)
+    first_year, last_year = int(store.years[0]), int(store.years[-1])
+    current = set()
+    for start in window_starts(first_year, last_year, window, step):
+        years = set(range(start, min(start + window, last_year + 1)))
+        for year in sorted(current - years):
+            graph.update(year, -1)
+        for year in sorted(years - current):
+            graph.update(year, 1)
+        current = years
+        end = max(years)
+        yield (start, end) + graph.statistics(f"weighted_{start}_{end}_dataset")
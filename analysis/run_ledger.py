@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Opt-in run ledger: wall time, CPU time, peak RSS, input bytes and edges/sec of every
+step and of every graph processed by a step, appended as JSON lines to
+<statistics_out_basedir>/<ledger_filename>.
+
+Enabled from the [instrumentation] section of the TOML configuration. Running this file
+prints a comparison of the recorded runs:
+  run_ledger.py <ledger.jsonl> [<run_id> <run_id> ...]
+"""
+
+import atexit
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import profiling
+
+# peak_rss_mb is the running maximum of the per-unit peaks, as every unit resets VmHWM
+_ledger = {"enabled": False, "path": None, "run_id": None, "step": None, "version": None, "peak_rss_mb": 0.0}
+
+
+def pipeline_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def reset_peak_rss() -> bool:
+    # Linux only: writing 5 to clear_refs resets the peak RSS of the process, both VmHWM and ru_maxrss
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # without /proc the peak cannot be reset either, so ru_maxrss (in KB on Linux) is the process peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _track_peak_rss() -> float:
+    """Current peak RSS, folded into the running step maximum of the ledger."""
+    peak = peak_rss_mb()
+    _ledger["peak_rss_mb"] = max(_ledger["peak_rss_mb"], peak)
+    return peak
+
+
+def _cpu_seconds() -> float:
+    # includes the worker processes that have already been joined
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _json_value(value):
+    # numpy scalars (e.g. edge counts computed with numpy) as Python numbers
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _append(record: dict):
+    with open(_ledger["path"], "a") as f:
+        f.write(json.dumps(record, default=_json_value) + "\n")
+
+
+def configure(configuration: dict, step: str):
+    """
+    Enable the ledger for a step if requested by the configuration. The whole step is
+    recorded when the interpreter exits. Profiling hooks (see profiling.py) are set up too.
+    :param configuration: parsed TOML configuration
+    :param step: step name (e.g. "05_community_extraction")
+    """
+    profiling.configure(configuration, step)
+
+    settings = configuration.get("instrumentation", {})
+    if not settings.get("enabled", False):
+        return
+
+    os.makedirs(configuration["statistics_out_basedir"], exist_ok=True)
+    _ledger.update(
+        enabled=True,
+        path=os.path.join(configuration["statistics_out_basedir"], settings.get("ledger_filename", "run_ledger.jsonl")),
+        run_id=f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        step=step,
+        version=pipeline_version(),
+    )
+
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    wall, cpu = time.perf_counter(), _cpu_seconds()
+
+    def record_step():
+        _track_peak_rss()
+        _append({
+            "run_id": _ledger["run_id"],
+            "version": _ledger["version"],
+            "step": step,
+            "unit": "step",
+            "started_at": started_at,
+            "wall_seconds": time.perf_counter() - wall,
+            "cpu_seconds": _cpu_seconds() - cpu,
+            # the peak is reset by every unit: the step peak is the maximum of the peaks read
+            # before every reset and after every unit, and of the peak since the last unit
+            "peak_rss_mb": _ledger["peak_rss_mb"],
+            "input_bytes": None,
+            "edges": None,
+            "edges_per_second": None,
+        })
+
+    atexit.register(record_step)
+    print(f"Run ledger enabled: {_ledger['path']} (run {_ledger['run_id']})")
+
+
+@contextmanager
+def measure(unit: str, input_path: str = None):
+    """
+    Record a unit of work (typically one graph) of the configured step, and profile it
+    if selected in the [profiling] section.
+    The yielded dictionary can be filled with the number of processed edges:
+        with measure(graph_name, graph_path) as record:
+            ...
+            record["edges"] = graph.number_of_edges()
+    """
+    record = {"edges": None}
+    with profiling.profile(unit):
+        if not _ledger["enabled"]:
+            yield record
+            return
+
+        started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        _track_peak_rss()
+        peak_reset = reset_peak_rss()
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        yield record
+        wall, cpu = time.perf_counter() - wall, _cpu_seconds() - cpu
+
+        edges = record["edges"]
+        _append({
+            "run_id": _ledger["run_id"],
+            "version": _ledger["version"],
+            "step": _ledger["step"],
+            "unit": unit,
+            "started_at": started_at,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_rss_mb": _track_peak_rss() if peak_reset else None,
+            "input_bytes": os.path.getsize(input_path) if input_path and os.path.exists(input_path) else None,
+            "edges": edges,
+            "edges_per_second": edges / wall if edges is not None and wall > 0 else None,
+        })
+
+
+def summarize(ledger_path: str, run_ids: list = None):
+    """
+    Print wall time and peak RSS of every (step, unit) side by side for the given runs
+    (by default the two most recent runs of every step), with the ratio to the first run.
+    """
+    import pandas as pd
+
+    df = pd.read_json(ledger_path, lines=True)
+    if run_ids:
+        df = df[df["run_id"].isin(run_ids)]
+    else:
+        latest = df.drop_duplicates(["step", "run_id"]).sort_values("started_at").groupby("step").tail(2)
+        df = df[df["run_id"].isin(latest["run_id"])]
+
+    for step, step_df in df.groupby("step"):
+        runs = step_df.drop_duplicates("run_id").sort_values("started_at")
+        labels = {row.run_id: f"{row.run_id} ({row.version})" for row in runs.itertuples()}
+        print(f"\n{'=' * 60}\n{step.center(60)}\n{'=' * 60}")
+
+        for metric in ("wall_seconds", "peak_rss_mb"):
+            table = step_df.pivot_table(index="unit", columns="run_id", values=metric, aggfunc="last")
+            table = table[[run for run in runs["run_id"] if run in table.columns]]
+            if table.shape[1] > 1:
+                for run in table.columns[1:]:
+                    table[f"{run} / first"] = table[run] / table[table.columns[0]]
+            print(f"\n[{metric}]  runs: " + ", ".join(labels[run] for run in runs["run_id"]))
+            print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <ledger.jsonl> [<run_id> <run_id> ...]")
+        sys.exit(1)
+    summarize(sys.argv[1], sys.argv[2:])
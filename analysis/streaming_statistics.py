@@ -0,0 +1,148 @@
+"""
+Out-of-core structural statistics of weighted edge lists (author1,author2,weight[,...]),
+for graphs that do not fit in memory as a rustworkx graph.
+
+Pass 1 reads the CSV in chunks and spools the edges to disk-backed arrays, collecting the
+sorted author ids. Pass 2 (accumulate) walks the spooled edges chunk by chunk, accumulating degrees,
+strengths and the connected components (union-find). Only the current chunk and a few
+arrays with one entry per node are held in memory. Triangle based metrics (transitivity)
+are not computed and are reported as NaN.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from union_find import UnionFind
+
+# weights are float, so that the time-decayed weights of the backbones are not truncated
+SPOOLED_ARRAYS = {"sources": np.int64, "targets": np.int64, "weights": np.float64}
+
+
+def spool_edges(graph_path: str, work_directory: str, is_bacbone: bool = False, chunk_size: int = 5_000_000):
+    """
+    Pass 1: copy the author and weight columns of an edge list to disk-backed arrays.
+    :param is_bacbone: whether the file has a header line (backbones do)
+    :return: (sorted distinct author ids, dictionary of read-only memmaps keyed as SPOOLED_ARRAYS)
+    """
+    nodes = np.empty(0, dtype=np.int64)
+    paths = {name: os.path.join(work_directory, f"{name}.bin") for name in SPOOLED_ARRAYS}
+    files = {name: open(path, "wb") for name, path in paths.items()}
+    try:
+        reader = pd.read_csv(graph_path, header=None, usecols=[0, 1, 2], names=["author1", "author2", "weight"],
+                             skiprows=1 if is_bacbone else 0, dtype={"author1": str, "author2": str},
+                             chunksize=chunk_size)
+        for chunk in reader:
+            sources = chunk["author1"].str.lstrip("A").to_numpy(dtype=np.int64)
+            targets = chunk["author2"].str.lstrip("A").to_numpy(dtype=np.int64)
+            files["sources"].write(sources.tobytes())
+            files["targets"].write(targets.tobytes())
+            files["weights"].write(chunk["weight"].to_numpy(dtype=np.float64).tobytes())
+            nodes = np.union1d(nodes, np.concatenate([sources, targets]))
+    finally:
+        for f in files.values():
+            f.close()
+
+    edges = {
+        name: np.memmap(paths[name], dtype=dtype, mode="r") if os.path.getsize(paths[name]) else np.empty(0, dtype)
+        for name, dtype in SPOOLED_ARRAYS.items()
+    }
+    return nodes, edges
+
+
+def node_degrees(n_nodes: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray):
+    """
+    Degree and strength of every node from edge arrays of node indices.
+    Self-loops count twice in the degree and once in the strength, as in rustworkx.
+    :return: (degree per node, strength per node)
+    """
+    loops = sources == targets
+    degree = np.bincount(sources, minlength=n_nodes) + np.bincount(targets, minlength=n_nodes)
+    strength = np.bincount(sources, weights=weights, minlength=n_nodes)
+    strength += np.bincount(targets[~loops], weights=weights[~loops], minlength=n_nodes)
+    return degree, strength
+
+
+def spooled_chunks(nodes: np.ndarray, edges: dict, chunk_size: int = 5_000_000):
+    """Chunks of the spooled edges, with author ids replaced by their node index."""
+    for start in range(0, len(edges["sources"]), chunk_size):
+        yield (np.searchsorted(nodes, edges["sources"][start:start + chunk_size]),
+               np.searchsorted(nodes, edges["targets"][start:start + chunk_size]),
+               np.asarray(edges["weights"][start:start + chunk_size]))
+
+
+def accumulate(n_nodes: int, chunks):
+    """
+    Degree, strength and connected components over chunks of edges, so that only one chunk
+    and its temporaries are in memory at a time.
+    :param chunks: iterable of (sources, targets, weights) arrays of node indices
+    :return: (degree per node, strength per node, component label per node, component sizes)
+    """
+    degree = np.zeros(n_nodes, dtype=np.int64)
+    strength = np.zeros(n_nodes, dtype=np.float64)
+    components = UnionFind(n_nodes)
+
+    for sources, targets, weights in chunks:
+        chunk_degree, chunk_strength = node_degrees(n_nodes, sources, targets, weights)
+        degree += chunk_degree
+        strength += chunk_strength
+        components.union(sources, targets)
+
+    labels, sizes = components.components()
+    return degree, strength, labels, sizes
+
+
+def degree_statistics(graph_name: str, degree: np.ndarray, strength: np.ndarray, n_edges: int,
+                      n_components: int, transitivity: float = np.nan) -> dict:
+    """
+    Structural statistics from the degree and strength of every node, with the same keys as
+    compute_structural_statistics.compute_structural_stats.
+    """
+    n_nodes = len(degree)
+    try:
+        density = n_edges / (n_nodes * (n_nodes - 1) / 2)
+    except ZeroDivisionError:
+        density = -1
+
+    return {
+        'graph_name': graph_name,
+        'number_of_nodes': n_nodes,
+        'number_of_edges': n_edges,
+        'min_degree': degree.min(),
+        'max_degree': degree.max(),
+        'mean_degree': np.mean(degree),
+        'median_degree': np.median(degree),
+        'degree_std': np.std(degree),
+        'w_min_degree': strength.min(),
+        'w_max_degree': strength.max(),
+        'w_mean_degree': np.mean(strength),
+        'w_median_degree': np.median(strength),
+        'w_degree_std': np.std(strength),
+        'density': density,
+        'transitivity': transitivity,
+        'n_connected_components': n_components,
+    }
+
+
+def streaming_structural_stats(graph_path: str, graph_name: str, is_bacbone: bool = False,
+                               chunk_size: int = 5_000_000, work_directory: str = None):
+    """
+    Structural statistics of a graph and of its largest connected component in bounded memory.
+    :param work_directory: where the spooled edges are stored, the system temporary directory by default
+    :return: (statistics of the graph, statistics of the largest connected component, number of edges)
+    """
+    with tempfile.TemporaryDirectory(prefix=f"{graph_name}_", dir=work_directory or None) as spool_directory:
+        nodes, edges = spool_edges(graph_path, spool_directory, is_bacbone, chunk_size)
+        n_edges = len(edges["sources"])
+        degree, strength, labels, sizes = accumulate(len(nodes), spooled_chunks(nodes, edges, chunk_size))
+        del edges
+
+    stats = degree_statistics(graph_name, degree, strength, n_edges, len(sizes))
+
+    # every edge of the largest component has both ends in it, so its edges are half of its degrees
+    largest = labels == np.argmax(sizes)
+    largest_cc_stats = degree_statistics(graph_name, degree[largest], strength[largest],
+                                         int(degree[largest].sum()) // 2, 1)
+    return stats, largest_cc_stats, n_edges
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Synthetic collaboration networks in the pipeline file formats, used to benchmark the
+analysis steps without a real OpenAlex snapshot.
+
+Works are generated year by year with a geometric growth of the number of works and
+of the author pool. Authors are drawn with a skewed popularity, which gives power-law
+degree distributions. The output directory mirrors <workflow_data>/<country>/:
+  - {year}.csv                                   yearly 4-column edge lists (years/)
+  - {start}_{end}_dataset.csv                    interval 4-column edge lists
+  - nets_weighted/weighted_{start}_{end}_dataset.csv
+  - backbones/backbone_weighted_{start}_{end}_dataset.csv
+  - metadata_dataset.csv
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from topic_categories import topic_to_category
+
+# Offsets making synthetic ids look like OpenAlex ones (e.g. A5000000042, W4000000042)
+AUTHOR_ID_OFFSET = 5_000_000_000
+WORK_ID_OFFSET = 4_000_000_000
+
+
+def draw_authors_per_work(rng, n_works: int, max_authors: int, exponent: float) -> np.ndarray:
+    return np.minimum(rng.zipf(exponent, n_works), max_authors)
+
+
+def expected_edges_per_work(rng, max_authors: int, exponent: float) -> float:
+    # single-author works produce one self-edge, as the C++ generator does
+    k = draw_authors_per_work(rng, 100_000, max_authors, exponent)
+    return float(np.mean(np.where(k == 1, 1, k * (k - 1) // 2)))
+
+
+def works_per_year(total_edges: int, years: list, growth: float, edges_per_work: float) -> np.ndarray:
+    shares = (1 + growth) ** np.arange(len(years))
+    shares /= shares.sum()
+    return np.maximum(1, np.round(shares * total_edges / edges_per_work)).astype(np.int64)
+
+
+def generate_year_edges(rng, n_works: int, pool_size: int, first_work: int, max_authors: int,
+                        exponent: float, skew: float):
+    """
+    Generate the works of one year and their collaboration edges.
+    :return: (work ids, authors per work, edge work ids, edge first authors, edge second authors)
+             with authors as indices into the author pool
+    """
+    k = draw_authors_per_work(rng, n_works, max_authors, exponent)
+    work_ids = np.arange(first_work, first_work + n_works, dtype=np.int64)
+
+    edge_works, edge_a1, edge_a2 = [], [], []
+    for size in np.unique(k):
+        works = work_ids[k == size]
+        # low indices are the oldest and most popular authors
+        authors = np.floor(pool_size * rng.random((len(works), size)) ** skew).astype(np.int64)
+        if size == 1:
+            edge_works.append(works)
+            edge_a1.append(authors[:, 0])
+            edge_a2.append(authors[:, 0])
+            continue
+        rows, cols = np.triu_indices(size, 1)
+        a1 = authors[:, rows].ravel()
+        a2 = authors[:, cols].ravel()
+        keep = a1 != a2
+        edge_works.append(np.repeat(works, len(rows))[keep])
+        edge_a1.append(a1[keep])
+        edge_a2.append(a2[keep])
+
+    return work_ids, k, np.concatenate(edge_works), np.concatenate(edge_a1), np.concatenate(edge_a2)
+
+
+def pair_counts(a1: np.ndarray, a2: np.ndarray):
+    keys = (np.minimum(a1, a2).astype(np.uint64) << np.uint64(32)) | np.maximum(a1, a2).astype(np.uint64)
+    return np.unique(keys, return_counts=True)
+
+
+def merge_pair_counts(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray, new_counts: np.ndarray):
+    merged_keys, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    merged_counts = np.bincount(inverse, weights=np.concatenate([counts, new_counts])).astype(np.int64)
+    return merged_keys, merged_counts
+
+
+def write_weighted(path: str, keys: np.ndarray, counts: np.ndarray):
+    a1 = (keys >> np.uint64(32)).astype(np.int64) + AUTHOR_ID_OFFSET
+    a2 = (keys & np.uint64(0xFFFFFFFF)).astype(np.int64) + AUTHOR_ID_OFFSET
+    np.savetxt(path, np.column_stack((a1, a2, counts)), fmt="A%d,A%d,%d")
+
+
+def write_backbone(rng, path: str, keys: np.ndarray, counts: np.ndarray, fraction: float):
+    # keep the heaviest edges, with random tie-breaking, as a stand-in for the disparity filter
+    order = np.lexsort((rng.random(len(keys)), -counts))[: max(1, int(len(keys) * fraction))]
+    a1 = (keys[order] >> np.uint64(32)).astype(np.int64) + AUTHOR_ID_OFFSET
+    a2 = (keys[order] & np.uint64(0xFFFFFFFF)).astype(np.int64) + AUTHOR_ID_OFFSET
+    p_values = rng.random(len(order)) * 0.05
+    with open(path, "w") as f:
+        f.write("source,target,weight,p_value\n")
+        for row in zip(a1.tolist(), a2.tolist(), counts[order].tolist(), p_values.tolist()):
+            f.write("A%d,A%d,%d,%s\n" % row)
+
+
+def write_metadata_rows(rng, f, year: int, work_ids: np.ndarray, k: np.ndarray, topics: list, skew: float):
+    n_topics = rng.integers(1, 9, len(work_ids))
+    picks = np.floor(len(topics) * rng.random(int(n_topics.sum())) ** skew).astype(np.int64)
+    bounds = np.concatenate([[0], np.cumsum(n_topics)])
+    for i, (work_id, authors) in enumerate(zip(work_ids.tolist(), k.tolist())):
+        work_topics = ";".join(topics[t] for t in picks[bounds[i]:bounds[i + 1]])
+        f.write(f"W{work_id + WORK_ID_OFFSET},{year},{authors},{work_topics}\n")
+
+
+def generate(output_dir: str, total_edges: int, start_year: int, end_year: int, intervals: list,
+             growth: float = 0.08, authors_ratio: float = 0.6, max_authors: int = 30,
+             authors_exponent: float = 2.2, skew: float = 2.5, backbone_fraction: float = 0.2,
+             seed: int = 42):
+    """
+    Write a synthetic dataset with roughly total_edges collaboration edges.
+    :param intervals: list of (start, end) year intervals for the interval, weighted and backbone files
+    :param growth: yearly growth rate of the number of works
+    :param authors_ratio: size of the author pool relative to the cumulative number of works
+    :param skew: popularity skew of authors and topics (1 = uniform)
+    """
+    rng = np.random.default_rng(seed)
+    years = list(range(start_year, end_year + 1))
+    n_works = works_per_year(total_edges, years, growth,
+                             expected_edges_per_work(rng, max_authors, authors_exponent))
+    topics = list(topic_to_category)
+
+    years_dir = os.path.join(output_dir, "years")
+    weighted_dir = os.path.join(output_dir, "nets_weighted")
+    backbone_dir = os.path.join(output_dir, "backbones")
+    for directory in (years_dir, weighted_dir, backbone_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    interval_files = [open(os.path.join(output_dir, f"{s}_{e}_dataset.csv"), "w") for s, e in intervals]
+    interval_pairs = [(np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)) for _ in intervals]
+    metadata = open(os.path.join(output_dir, "metadata_dataset.csv"), "w")
+    metadata.write("work_id,year,num_of_authors,topics\n")
+
+    first_work = 0
+    edges_written = 0
+    for year, works in zip(years, n_works):
+        pool_size = max(2, int(authors_ratio * (first_work + works)))
+        work_ids, k, edge_works, a1, a2 = generate_year_edges(
+            rng, int(works), pool_size, first_work, max_authors, authors_exponent, skew
+        )
+        first_work += int(works)
+        edges_written += len(edge_works)
+
+        rows = np.column_stack((np.full(len(edge_works), year), edge_works + WORK_ID_OFFSET,
+                                a1 + AUTHOR_ID_OFFSET, a2 + AUTHOR_ID_OFFSET))
+        np.savetxt(os.path.join(years_dir, f"{year}.csv"), rows, fmt="%d,W%d,A%d,A%d")
+        write_metadata_rows(rng, metadata, year, work_ids, k, topics, skew)
+
+        # edges go to the first interval containing the year, as in the C++ --format split
+        for idx, (s, e) in enumerate(intervals):
+            if s <= year <= e:
+                np.savetxt(interval_files[idx], rows, fmt="%d,W%d,A%d,A%d")
+                interval_pairs[idx] = merge_pair_counts(*interval_pairs[idx], *pair_counts(a1, a2))
+                break
+
+        print(f"\t{year}: {works} works, {len(edge_works)} edges, {pool_size} authors in pool")
+
+    metadata.close()
+    for f in interval_files:
+        f.close()
+
+    for (s, e), (keys, counts) in zip(intervals, interval_pairs):
+        name = f"weighted_{s}_{e}_dataset"
+        write_weighted(os.path.join(weighted_dir, f"{name}.csv"), keys, counts)
+        write_backbone(rng, os.path.join(backbone_dir, f"backbone_{name}.csv"), keys, counts, backbone_fraction)
+
+    print(f"Generated {edges_written} edges over {first_work} works in {output_dir}")
+
+
+def parse_intervals(text: str) -> list:
+    return [tuple(int(y) for y in interval.split("-")) for interval in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic collaboration dataset")
+    parser.add_argument("output_dir")
+    parser.add_argument("--edges", type=float, default=1e5, help="approximate number of edges (1e4 - 1e8)")
+    parser.add_argument("--start-year", type=int, default=1980)
+    parser.add_argument("--end-year", type=int, default=2025)
+    parser.add_argument("--intervals", type=parse_intervals,
+                        default=parse_intervals("1980-2009,2010-2011,2012-2013,2014-2015,2016-2020,2021-2025"))
+    parser.add_argument("--growth", type=float, default=0.08, help="yearly growth of the number of works")
+    parser.add_argument("--authors-ratio", type=float, default=0.6, help="author pool size per cumulative work")
+    parser.add_argument("--skew", type=float, default=2.5, help="popularity skew of authors and topics")
+    parser.add_argument("--backbone-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(args.output_dir, int(args.edges), args.start_year, args.end_year, args.intervals,
+             growth=args.growth, authors_ratio=args.authors_ratio, skew=args.skew,
+             backbone_fraction=args.backbone_fraction, seed=args.seed)
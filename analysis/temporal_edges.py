@@ -0,0 +1,191 @@
+"""
+Temporal edge store: the 4-column collaboration edges (year, work, author1, author2) of every
+year as memory-mapped NumPy columns sorted by year, with the offset of every year, so that
+the edges of any [start, end] interval are a zero-copy slice of the columns instead of a
+file produced by the C++ --format split.
+
+A store is a directory holding one raw column file per COLUMNS entry and index.npz with the
+stored years and their row offsets. Works and authors are int64 ids without the "W" / "A"
+prefix. Running this file builds a store from the yearly files ({year}.csv) of a directory, or
+writes the weighted edge lists of intervals given as in the C++ --format option:
+  temporal_edges.py build <years_directory> <store_directory>
+  temporal_edges.py weighted <store_directory> <output_directory> 1980-2009,2010-2015,2016-
+"""
+
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pair_index import pack_pairs
+
+COLUMNS = {"year": np.int16, "work": np.int64, "author1": np.int64, "author2": np.int64}
+INDEX_FILE = "index.npz"
+
+
+def yearly_files(years_directory: str) -> list:
+    """(year, path) of the {year}.csv files of a directory, in chronological order."""
+    years = [(int(name[:-4]), os.path.join(years_directory, name))
+             for name in os.listdir(years_directory) if re.fullmatch(r"\d{4}\.csv", name)]
+    return sorted(years)
+
+
+def build_store(years_directory: str, store_directory: str, chunk_size: int = 5_000_000) -> str:
+    """
+    Append the yearly files in chronological order to the column files of the store, so that
+    rows are sorted by year without any in-memory sort.
+    """
+    os.makedirs(store_directory, exist_ok=True)
+    files = {name: open(os.path.join(store_directory, f"{name}.bin"), "wb") for name in COLUMNS}
+    years, offsets = [], [0]
+    try:
+        for year, path in yearly_files(years_directory):
+            rows = 0
+            reader = pd.read_csv(path, header=None, names=list(COLUMNS), dtype=str, chunksize=chunk_size)
+            for chunk in reader:
+                files["year"].write(chunk["year"].to_numpy(dtype=COLUMNS["year"]).tobytes())
+                files["work"].write(chunk["work"].str.lstrip("W").to_numpy(dtype=np.int64).tobytes())
+                files["author1"].write(chunk["author1"].str.lstrip("A").to_numpy(dtype=np.int64).tobytes())
+                files["author2"].write(chunk["author2"].str.lstrip("A").to_numpy(dtype=np.int64).tobytes())
+                rows += len(chunk)
+            years.append(year)
+            offsets.append(offsets[-1] + rows)
+            print(f"\t{year}: {rows} edges")
+    finally:
+        for f in files.values():
+            f.close()
+
+    np.savez(os.path.join(store_directory, INDEX_FILE), years=np.array(years, dtype=np.int64),
+             offsets=np.array(offsets, dtype=np.int64))
+    print(f"Temporal edge store with {offsets[-1]} edges written to {store_directory}")
+    return store_directory
+
+
+class TemporalEdgeStore:
+
+    def __init__(self, store_directory: str):
+        with np.load(os.path.join(store_directory, INDEX_FILE)) as index:
+            self.years, self.offsets = index["years"], index["offsets"]
+        self.columns = {
+            name: np.memmap(os.path.join(store_directory, f"{name}.bin"), dtype=dtype, mode="r")
+            if self.offsets[-1] else np.empty(0, dtype)
+            for name, dtype in COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def rows(self, start: int = None, end: int = None) -> slice:
+        """
+        Rows of the edges published in [start, end]; a missing bound includes all the years
+        before or after the other one, as in the C++ --format split.
+        """
+        first = 0 if start is None else np.searchsorted(self.years, start, side="left")
+        last = len(self.years) if end is None else np.searchsorted(self.years, end, side="right")
+        return slice(int(self.offsets[first]), int(self.offsets[last]))
+
+    def edges(self, start: int = None, end: int = None) -> dict:
+        """Columns of the edges published in [start, end] (see rows), as read-only views."""
+        rows = self.rows(start, end)
+        return {name: column[rows] for name, column in self.columns.items()}
+
+    def authors(self, start: int = None, end: int = None, chunk_size: int = 5_000_000) -> np.ndarray:
+        """Sorted distinct author ids of the edges published in [start, end]."""
+        edges = self.edges(start, end)
+        authors = np.empty(0, dtype=np.int64)
+        for offset in range(0, len(edges["author1"]), chunk_size):
+            authors = np.union1d(authors, np.concatenate([edges["author1"][offset:offset + chunk_size],
+                                                          edges["author2"][offset:offset + chunk_size]]))
+        return authors
+
+    def pair_counts(self, authors: np.ndarray, start: int = None, end: int = None, chunk_size: int = 5_000_000):
+        """
+        Collaboration count of every author pair of [start, end], with pairs packed into uint64
+        keys (pair_index.pack_pairs) over the positions of their authors in a sorted id array
+        (author ids do not fit in 32 bits). Counts are reduced chunk by chunk and merged.
+        :param authors: sorted author ids including those of the interval (see authors)
+        :return: (sorted unique keys, counts)
+        """
+        edges = self.edges(start, end)
+        keys, counts = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        for offset in range(0, len(edges["author1"]), chunk_size):
+            chunk_keys, chunk_counts = np.unique(
+                pack_pairs(np.searchsorted(authors, edges["author1"][offset:offset + chunk_size]),
+                           np.searchsorted(authors, edges["author2"][offset:offset + chunk_size])),
+                return_counts=True)
+            if not len(keys):
+                keys, counts = chunk_keys, chunk_counts.astype(np.int64)
+                continue
+            keys, inverse = np.unique(np.concatenate([keys, chunk_keys]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([counts, chunk_counts])).astype(np.int64)
+        return keys, counts
+
+    def weighted_edges(self, start: int = None, end: int = None, chunk_size: int = 5_000_000):
+        """
+        Collaboration count of every author pair of [start, end], as the C++ --extract-weighted:
+        pairs are canonical (smaller id first) and single-author works count as self-loops.
+        :return: (first author ids, second author ids, counts), sorted by pair
+        """
+        authors = self.authors(start, end, chunk_size)
+        keys, counts = self.pair_counts(authors, start, end, chunk_size)
+        return unpack_authors(authors, keys) + (counts,)
+
+
+def unpack_authors(authors: np.ndarray, keys: np.ndarray):
+    """(first author ids, second author ids) of packed pair keys over a sorted author id array."""
+    return authors[(keys >> np.uint64(32)).astype(np.int64)], authors[(keys & np.uint64(0xFFFFFFFF)).astype(np.int64)]
+
+
+def write_weighted(path: str, author1: np.ndarray, author2: np.ndarray, counts: np.ndarray):
+    """Weighted edge list in the format of the C++ --extract-weighted output (no header)."""
+    np.savetxt(path, np.column_stack((author1, author2, counts)), fmt="A%d,A%d,%d")
+
+
+def open_store(store_directory: str, years_directory: str, chunk_size: int = 5_000_000) -> TemporalEdgeStore:
+    """The store of a directory, built from the yearly files first if it does not exist yet."""
+    if not os.path.exists(os.path.join(store_directory, INDEX_FILE)):
+        print(f"Building the temporal edge store {store_directory} from {years_directory}")
+        build_store(years_directory, store_directory, chunk_size)
+    return TemporalEdgeStore(store_directory)
+
+
+def parse_intervals(text: str) -> list:
+    """Intervals of the C++ --format option ("1980-2009,2016-"), a missing year being an open bound."""
+    intervals = []
+    for interval in text.split(","):
+        start, _, end = interval.partition("-")
+        intervals.append((int(start) if start else None, int(end) if end else None))
+    return intervals
+
+
+def write_interval_weighted(store_directory: str, output_directory: str, intervals: list, chunk_size: int = 5_000_000):
+    """Write weighted_{start}_{end}_dataset.csv for every (start, end) interval, as the C++ tools name it."""
+    store = TemporalEdgeStore(store_directory)
+    os.makedirs(output_directory, exist_ok=True)
+    for start, end in intervals:
+        path = os.path.join(output_directory, f"weighted_{start or ''}_{end or ''}_dataset.csv")
+        author1, author2, counts = store.weighted_edges(start, end, chunk_size)
+        write_weighted(path, author1, author2, counts)
+        print(f"\t{start or ''}-{end or ''}: {len(counts)} weighted edges written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temporal edge store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a store from yearly edge files")
+    build.add_argument("years_directory")
+    build.add_argument("store_directory")
+    weighted = commands.add_parser("weighted", help="write the weighted edge lists of intervals")
+    weighted.add_argument("store_directory")
+    weighted.add_argument("output_directory")
+    weighted.add_argument("intervals", type=parse_intervals, help="e.g. 1980-2009,2010-2015,2016-")
+    for command in (build, weighted):
+        command.add_argument("--chunk-size", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_store(args.years_directory, args.store_directory, args.chunk_size)
+    else:
+        write_interval_weighted(args.store_directory, args.output_directory, args.intervals, args.chunk_size)
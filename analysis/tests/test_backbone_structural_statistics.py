@@ -0,0 +1,74 @@
+"""
+Step 04 (compute_structural_statistics.run on backbones) on a backbone with the time-decayed
+float weights written by 03_backbone.py when backbones.config.decay_half_life is set.
+Run from the analysis directory: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compute_structural_statistics import run
+from synthetic_networks import generate
+from temporal_edges import build_store, TemporalEdgeStore
+from time_decay import decayed_interval_weights
+
+
+class DecayedBackboneStatisticsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        dataset = os.path.join(cls.directory.name, "dataset")
+        generate(dataset, 5_000, 2015, 2025, [(2021, 2025)])
+        store = TemporalEdgeStore(build_store(os.path.join(dataset, "years"), os.path.join(dataset, "store")))
+        _, _, author1, author2, weights = next(decayed_interval_weights(store, [(2021, 2025)], 2.0))
+
+        # same columns as the backbones written by dump_backbone (networkx.to_pandas_edgelist)
+        cls.backbones = os.path.join(cls.directory.name, "backbones")
+        os.makedirs(cls.backbones)
+        cls.edges = pd.DataFrame({"source": [f"A{author}" for author in author1.tolist()],
+                                  "target": [f"A{author}" for author in author2.tolist()],
+                                  "weight": weights, "p_value": 0.01})
+        cls.edges.to_csv(os.path.join(cls.backbones, "backbone_weighted_2021_2025_dataset.csv"), index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def statistics(self, streaming: bool):
+        output = tempfile.mkdtemp(dir=self.directory.name)
+        stats_file, largest_cc_file = f"{output}/stats.csv", f"{output}/stats_largest_cc.csv"
+        run(self.backbones, stats_file, largest_cc_file, True, streaming, 1_000, output)
+        return pd.read_csv(stats_file).iloc[0], pd.read_csv(largest_cc_file).iloc[0]
+
+    def test_decayed_weights_are_not_truncated(self):
+        self.assertFalse(np.allclose(self.edges["weight"], np.round(self.edges["weight"])))
+        loops = self.edges["source"] == self.edges["target"]
+        # self-loops count once in the strength, other edges once per end
+        total_strength = 2 * self.edges["weight"][~loops].sum() + self.edges["weight"][loops].sum()
+        n_nodes = len(pd.unique(self.edges[["source", "target"]].values.ravel()))
+
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                stats, largest_cc_stats = self.statistics(streaming)
+                self.assertEqual(stats["number_of_edges"], len(self.edges))
+                self.assertGreater(stats["w_min_degree"], 0)
+                self.assertAlmostEqual(stats["w_mean_degree"] * n_nodes, total_strength, places=6)
+                self.assertLessEqual(largest_cc_stats["w_max_degree"], stats["w_max_degree"])
+
+    def test_streaming_matches_in_memory(self):
+        in_memory, streaming = self.statistics(False), self.statistics(True)
+        for expected, actual in zip(in_memory, streaming):
+            columns = [c for c in expected.index if c.startswith("w_")]
+            np.testing.assert_allclose(actual[columns].astype(float), expected[columns].astype(float))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Smoke test of benchmark.py: every case runs on a small synthetic dataset.
+Run from the analysis directory: python -m unittest discover tests
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+ANALYSIS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ANALYSIS_DIR)
+
+from benchmark import CASES
+
+
+class BenchmarkSmokeTest(unittest.TestCase):
+
+    def test_every_case_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "benchmark.csv")
+            child = subprocess.run(
+                [sys.executable, os.path.join(ANALYSIS_DIR, "benchmark.py"), os.path.join(directory, "datasets"),
+                 "--scales", "1e4", "--runs", "2", "--output", output],
+                capture_output=True, text=True,
+            )
+            self.assertEqual(child.returncode, 0, child.stdout[-2000:] + child.stderr[-2000:])
+            results = pd.read_csv(output)
+            self.assertEqual(sorted(results["case"]), sorted(CASES))
+            self.assertTrue((results["wall_seconds"] >= 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
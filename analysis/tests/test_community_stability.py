@@ -0,0 +1,68 @@
+"""
+Step 06: the csr engine with the run ledger enabled, on a small synthetic dataset, and the statistics file.
+Run from the analysis directory: python -m unittest discover tests
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ANALYSIS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ANALYSIS_DIR)
+
+from benchmark import COUNTRY, load_step, write_config
+from synthetic_networks import generate
+
+
+class CsrStabilityLedgerTest(unittest.TestCase):
+
+    def test_csr_runs_are_recorded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            generate(os.path.join(directory, COUNTRY), 5_000, 2015, 2025, [(2015, 2020), (2021, 2025)])
+            config_path = write_config(directory)
+            with open(config_path) as f:
+                config = f.read()
+            for old, new in [('engine = "networkx"', 'engine = "csr"'), ("RUNS = 10", "RUNS = 3"),
+                             ("workers = 0", "workers = 2"), ("enabled = false", "enabled = true")]:
+                self.assertIn(old, config)
+                config = config.replace(old, new, 1)
+            with open(config_path, "w") as f:
+                f.write(config)
+
+            child = subprocess.run([sys.executable, "06_community_stability.py", config_path],
+                                   cwd=ANALYSIS_DIR, capture_output=True, text=True)
+            self.assertEqual(child.returncode, 0, child.stdout[-2000:] + child.stderr[-2000:])
+
+            with open(os.path.join(directory, "statistics", "run_ledger.jsonl")) as f:
+                records = [json.loads(line) for line in f]
+            units = [record for record in records if record["unit"] != "step"]
+            self.assertEqual(sorted(record["unit"] for record in units),
+                             ["backbone_weighted_2015_2020_dataset.csv", "backbone_weighted_2021_2025_dataset.csv"])
+            for record in units:
+                self.assertIsInstance(record["edges"], int)
+                self.assertGreater(record["edges"], 0)
+            self.assertEqual(sum(record["unit"] == "step" for record in records), 1)
+
+
+class StatisticsFileTest(unittest.TestCase):
+
+    def test_runs_column_is_added_to_an_earlier_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            step = load_step("06_community_stability.py", write_config(directory))
+            output_path = os.path.join(directory, "communities_stability_statistics.csv")
+            with open(output_path, "w") as f:
+                csv.writer(f).writerows([["dataset", "NMI", "ADJ_NMI"], ["1980_2009", 0.9, 0.8]])
+
+            step.dump_statistics("weighted_2010_2015_dataset_backbone.csv", [0.7, 0.6, 10], output_path)
+            with open(output_path, newline="") as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows, [["dataset", "NMI", "ADJ_NMI", "RUNS"], ["1980_2009", "0.9", "0.8", ""],
+                                    ["2010_2015", "0.7", "0.6", "10"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+CSR Louvain engine (louvain.py) against networkx on the karate club and a planted-partition graph.
+Run from the analysis directory: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import louvain
+
+SEEDS = range(5)
+
+
+def planted_partition_graph():
+    """Four planted communities of 32 nodes, with integer collaboration weights."""
+    graph = nx.planted_partition_graph(4, 32, 0.5, 0.02, seed=1)
+    rng = np.random.default_rng(1)
+    for u, v in graph.edges():
+        graph[u][v]["weight"] = int(rng.integers(1, 5))
+    return graph
+
+
+class CsrLouvainTest(unittest.TestCase):
+
+    def graphs(self):
+        return {"karate": nx.karate_club_graph(), "planted_partition": planted_partition_graph()}
+
+    def test_modularity_agrees_with_networkx_louvain(self):
+        for name, graph in self.graphs().items():
+            with self.subTest(graph=name):
+                names, adjacency = louvain.csr_from_networkx(graph)
+                csr = [nx.community.modularity(graph, louvain.louvain_communities(names, adjacency, seed=seed))
+                       for seed in SEEDS]
+                reference = [nx.community.modularity(graph, nx.community.louvain_communities(graph, seed=seed))
+                             for seed in SEEDS]
+                self.assertAlmostEqual(np.mean(csr), np.mean(reference), delta=0.01)
+                self.assertAlmostEqual(max(csr), max(reference), delta=0.005)
+
+    def test_planted_partition_is_recovered(self):
+        graph = planted_partition_graph()
+        names, adjacency = louvain.csr_from_networkx(graph)
+        communities = louvain.louvain_communities(names, adjacency, seed=0)
+        self.assertEqual(sorted(map(sorted, communities)), sorted(map(sorted, graph.graph["partition"])))
+
+    def test_partition_quality_equals_networkx(self):
+        for name, graph in self.graphs().items():
+            names, sources, targets, weights = louvain.networkx_edges(graph)
+            adjacency = louvain.csr_from_edges(sources, targets, weights, len(names))
+            for seed in SEEDS:
+                with self.subTest(graph=name, seed=seed):
+                    communities = louvain.louvain_communities(names, adjacency, seed=seed)
+                    labels = louvain.labels_from_communities(names, communities)
+                    modularity, coverage, performance = louvain.partition_quality(
+                        len(names), sources, targets, weights, labels)
+                    self.assertEqual(modularity, nx.community.modularity(graph, communities))
+                    self.assertEqual((coverage, performance), nx.community.partition_quality(graph, communities))
+                    # the CSR modularity sums the weights in another order
+                    self.assertAlmostEqual(louvain.modularity(adjacency, labels), modularity, places=12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+Time-decayed collaboration weights over the temporal edge store.
+
+The weight of an author pair in the interval [start, end] is the sum of its collaborations,
+each counted 0.5 ** ((end - year) / half_life), so that a work half_life years older than the
+end of the interval counts half. Weights are computed in one forward pass over the years of
+every interval: the running pair weights are decayed by the years elapsed and the pair counts
+of the new year are merged in, without building a graph per year.
+"""
+
+import numpy as np
+
+from cumulative_snapshots import merge_pair_counts
+from temporal_edges import TemporalEdgeStore, unpack_authors
+
+
+def decayed_interval_weights(store: TemporalEdgeStore, intervals: list, half_life: float, chunk_size: int = 5_000_000):
+    """
+    :param intervals: (start, end) year intervals
+    :return: generator of (start, end, first author ids, second author ids, decayed weights),
+             pairs being canonical and sorted as in TemporalEdgeStore.weighted_edges
+    """
+    decay = 0.5 ** (1 / half_life)
+    authors = store.authors(chunk_size=chunk_size)
+    for start, end in intervals:
+        keys, weights = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.float64)
+        last_year = start
+        for year in store.years[(store.years >= start) & (store.years <= end)].tolist():
+            year_keys, counts = store.pair_counts(authors, year, year, chunk_size)
+            weights *= decay ** (year - last_year)
+            keys, weights, _ = merge_pair_counts(keys, weights, year_keys, counts.astype(np.float64))
+            last_year = year
+        weights *= decay ** (end - last_year)
+        yield (start, end) + unpack_authors(authors, keys) + (weights,)
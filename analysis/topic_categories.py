@@ -0,0 +1,115 @@
+import ast
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+# Sorted "topic<TAB>category" table, one row per topic. Rows are sorted by topic
+# so that lookups are a binary search and never require hashing every entry.
+TOPIC_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "topic_to_category.tsv")
+
+
+def write_topic_table(mapping: dict, output_path: str = TOPIC_TABLE_PATH):
+    """
+    Write a topic -> category mapping in the sorted table format read by TopicCategoryTable.
+    :param mapping: dictionary mapping topic names to category names
+    :param output_path: destination of the table
+    """
+    with open(output_path, "w", encoding="utf-8") as f:
+        for topic in sorted(mapping):
+            if "\t" in topic or "\n" in topic:
+                raise ValueError(f"Topic {topic!r} contains a tab or newline")
+            f.write(f"{topic}\t{mapping[topic]}\n")
+
+
+class TopicCategoryTable(Mapping):
+    """
+    Read-only topic -> category mapping backed by the sorted table on disk.
+    The table is loaded on first access only.
+    """
+
+    def __init__(self, path: str = TOPIC_TABLE_PATH):
+        self.path = path
+        self._topics = None
+        self._codes = None
+        self._categories = None
+
+    def _load(self):
+        if self._topics is not None:
+            return
+
+        topics, categories = [], []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                topic, category = line.rstrip("\n").split("\t")
+                topics.append(topic)
+                categories.append(category)
+
+        self._topics = np.array(topics, dtype=object)
+        category_names, codes = np.unique(np.array(categories, dtype=object), return_inverse=True)
+        self._categories = list(category_names)
+        self._codes = codes.astype(np.int32)
+
+    @property
+    def categories(self) -> list:
+        """Category names, indexed by the ids returned by map_category_ids."""
+        self._load()
+        return self._categories
+
+    def topic_ids(self, topics) -> np.ndarray:
+        """
+        Map an array of topic names to their row in the table.
+        :param topics: iterable of topic names
+        :return: int64 array of row indices, -1 where the topic is unknown
+        """
+        self._load()
+        queries = np.asarray(topics, dtype=object)
+        idx = np.searchsorted(self._topics, queries)
+        idx = np.minimum(idx, len(self._topics) - 1)
+        found = self._topics[idx] == queries
+        return np.where(found, idx, -1)
+
+    def map_category_ids(self, topics) -> np.ndarray:
+        """
+        Map an array of topic names to category ids (see `categories`).
+        :param topics: iterable of topic names
+        :return: int32 array of category ids, -1 where the topic is unknown
+        """
+        idx = self.topic_ids(topics)
+        return np.where(idx >= 0, self._codes[idx], -1).astype(np.int32)
+
+    def __getitem__(self, topic):
+        idx = self.topic_ids([topic])[0]
+        if idx < 0:
+            raise KeyError(topic)
+        return self._categories[self._codes[idx]]
+
+    def __contains__(self, topic):
+        return self.topic_ids([topic])[0] >= 0
+
+    def __iter__(self):
+        self._load()
+        return iter(self._topics)
+
+    def __len__(self):
+        self._load()
+        return len(self._topics)
+
+
+topic_to_category = TopicCategoryTable()
+
+
+if __name__ == "__main__":
+    # Convert a legacy "topic_to_category = {...}" python module into the sorted table
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <legacy_mapping.py> [<output_table.tsv>]")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    mapping = ast.literal_eval(module.body[0].value)
+
+    output_path = sys.argv[2] if len(sys.argv) > 2 else TOPIC_TABLE_PATH
+    write_topic_table(mapping, output_path)
+    print(f"Stored {len(mapping)} topics to {output_path}")
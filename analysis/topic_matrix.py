@@ -0,0 +1,117 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def normalize_ascii(text):
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", "ignore")
+    return text.encode("ascii", "ignore").decode("ascii")
+
+
+def normalize_topic(topic: str) -> str:
+    # "Crystal (programming language)" -> "Programming language"
+    if "(" in topic and ")" in topic:
+        topic = topic[topic.find("(") + 1 : topic.find(")")].capitalize()
+    return normalize_ascii(topic)
+
+
+def build_year_topic_matrix(pair_counts: dict, raw_vocabulary: list):
+    """
+    Build the sparse years x topics count matrix from (year, raw topic id) counts.
+    Topic normalization is applied once per distinct raw topic, and raw topics that
+    normalize to the same name are merged into a single column.
+    :param pair_counts: dictionary mapping (year, raw topic id) to occurrences
+    :param raw_vocabulary: raw topic names, indexed by raw topic id
+    :return: (sorted years, normalized vocabulary, csr matrix of counts)
+    """
+    normalized = [normalize_topic(topic) for topic in raw_vocabulary]
+    vocabulary, raw_to_topic = np.unique(np.array(normalized, dtype=object), return_inverse=True)
+
+    keys = np.array(list(pair_counts.keys()), dtype=np.int64).reshape(-1, 2)
+    values = np.fromiter(pair_counts.values(), dtype=np.int64, count=len(pair_counts))
+    years, year_rows = np.unique(keys[:, 0], return_inverse=True)
+
+    counts = sp.coo_matrix(
+        (values, (year_rows, raw_to_topic[keys[:, 1]])),
+        shape=(len(years), len(vocabulary)),
+    ).tocsr()
+    counts.sum_duplicates()
+
+    return years, list(vocabulary), counts
+
+
+def select_years(years: np.ndarray, counts: sp.csr_matrix, window: list) -> sp.csr_matrix:
+    """
+    Restrict the count matrix to the given years, with empty rows for years without works.
+    """
+    year_rows = {int(year): row for row, year in enumerate(years)}
+    present = [(i, year_rows[year]) for i, year in enumerate(window) if year in year_rows]
+    rows = [i for i, _ in present]
+    cols = [row for _, row in present]
+    selection = sp.csr_matrix(
+        (np.ones(len(present), dtype=np.int64), (rows, cols)),
+        shape=(len(window), len(years)),
+    )
+    return selection @ counts
+
+
+def aggregation_matrix(groups: list):
+    """
+    Build a sparse topics x groups matrix summing topic columns into groups.
+    :param groups: group name for every topic of the vocabulary, None to drop the topic
+    :return: (csr aggregation matrix, group names indexed by column)
+    """
+    kept = [i for i, group in enumerate(groups) if group is not None]
+    group_names, group_cols = np.unique(np.array([groups[i] for i in kept], dtype=object), return_inverse=True)
+
+    aggregation = sp.csr_matrix(
+        (np.ones(len(kept), dtype=np.int64), (kept, group_cols)),
+        shape=(len(groups), len(group_names)),
+    )
+    return aggregation, list(group_names)
+
+
+def top_group_shares(group_counts: sp.csr_matrix, group_names: list, max_topics: int) -> dict:
+    """
+    Per-row percentages of the max_topics most frequent groups.
+    :return: dictionary mapping group name to an array of percentages (one per row),
+             ordered by first appearance in the top groups
+    """
+    counts = group_counts.toarray()
+    totals = counts.sum(axis=1, keepdims=True)
+    percentages = np.round(np.divide(counts * 100, totals, out=np.zeros(counts.shape), where=totals > 0), 2)
+
+    shares = {}
+    for row in range(counts.shape[0]):
+        present = np.flatnonzero(counts[row])
+        order = present[np.argsort(-percentages[row, present], kind="stable")][:max_topics]
+        for col in order:
+            if group_names[col] not in shares:
+                shares[group_names[col]] = np.zeros(counts.shape[0], dtype=float)
+            shares[group_names[col]][row] = percentages[row, col]
+
+    return shares
+
+
+def save_year_topic_matrix(path: str, years, works_per_year, vocabulary: list, counts: sp.csr_matrix,
+                           authors_per_work: np.ndarray):
+    """:param authors_per_work: (year, authors, works) rows of the authors per work histogram"""
+    np.savez_compressed(
+        path,
+        years=np.asarray(years, dtype=np.int64),
+        works_per_year=np.asarray(works_per_year, dtype=np.int64),
+        authors_per_work=np.asarray(authors_per_work, dtype=np.int64).reshape(-1, 3),
+        vocabulary=np.array(vocabulary, dtype=str),
+        data=counts.data,
+        indices=counts.indices,
+        indptr=counts.indptr,
+        shape=np.array(counts.shape),
+    )
+
+
+def load_year_topic_matrix(path: str):
+    """:return: (years, works per year, vocabulary, counts, authors per work histogram or None in older files)"""
+    with np.load(path) as f:
+        counts = sp.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+        authors_per_work = f["authors_per_work"] if "authors_per_work" in f.files else None
+        return f["years"], f["works_per_year"], f["vocabulary"].tolist(), counts, authors_per_work
@@ -0,0 +1,66 @@
+"""
+Array-based union-find (disjoint sets) over node indices 0..n-1, with path compression and
+union by size. Finds and unions are vectorised over whole arrays of nodes and edges.
+"""
+
+import numpy as np
+
+
+class UnionFind:
+
+    def __init__(self, n: int):
+        self.parent = np.arange(n, dtype=np.int32 if n < 2 ** 31 else np.int64)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, nodes: np.ndarray) -> np.ndarray:
+        """Roots of the given nodes. The queried nodes are linked directly to their root."""
+        roots = self.parent[nodes]
+        pending = np.flatnonzero(self.parent[roots] != roots)
+        while len(pending):
+            roots[pending] = self.parent[roots[pending]]
+            pending = pending[self.parent[roots[pending]] != roots[pending]]
+        self.parent[nodes] = roots
+        return roots
+
+    def union(self, sources: np.ndarray, targets: np.ndarray):
+        """Merge the sets of every (source, target) pair."""
+        while len(sources):
+            source_roots, target_roots = self.find(sources), self.find(targets)
+            differ = source_roots != target_roots
+            sources, targets = sources[differ], targets[differ]
+            source_roots, target_roots = source_roots[differ], target_roots[differ]
+            if not len(sources):
+                return
+
+            # the smaller root (ties broken by index) goes under the larger one, so that links
+            # always point to a greater (size, index) and no cycle can be formed
+            swap = (self.size[source_roots] > self.size[target_roots]) | (
+                (self.size[source_roots] == self.size[target_roots]) & (source_roots > target_roots)
+            )
+            small = np.where(swap, target_roots, source_roots)
+            large = np.where(swap, source_roots, target_roots)
+
+            # a root paired with several roots keeps only one of the writes, the other pairs
+            # are merged by the next iteration
+            self.parent[small] = large
+            linked = np.unique(small[self.parent[small] == large])
+            np.add.at(self.size, self.parent[linked], self.size[linked])
+
+    def components(self):
+        """
+        :return: (component label of every node, size of every component), with labels
+                 numbered 0..k-1 in order of their root index
+        """
+        roots = self.find(np.arange(len(self.parent)))
+        _, labels, sizes = np.unique(roots, return_inverse=True, return_counts=True)
+        return labels, sizes
+
+
+def connected_components(n_nodes: int, sources: np.ndarray, targets: np.ndarray):
+    """
+    Connected components of a graph given as edge arrays of node indices 0..n_nodes-1.
+    :return: (component label of every node, size of every component)
+    """
+    components = UnionFind(n_nodes)
+    components.union(sources, targets)
+    return components.components()